@@ -1,19 +1,63 @@
+import hashlib
 import logging
-from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from marshmallow import ValidationError
+from sqlalchemy import and_, func, update
 from sqlalchemy.exc import SQLAlchemyError
 
 from app import db
-from models import Client, PaymentBlock, BlockReason
+from models import Client, PaymentBlock, BlockReason, BlockEvent, ChangeSequence, StatCounter
 from schemas import (
     BlockPaymentSchema, 
     UnblockPaymentSchema, 
-    ClientStatusSchema, 
-    ClientBlockHistorySchema,
+    BatchStatusRequestSchema,
+    BulkBlockPaymentSchema,
+    BulkUnblockPaymentSchema,
     PaymentBlockSchema,
     ErrorSchema
 )
-from utils import get_or_create_client
+from utils import (
+    get_or_create_client,
+    get_or_create_clients,
+    create_active_block,
+    create_active_blocks,
+    touch_clients,
+    record_block_events,
+    block_stats
+)
+from cache import status_cache
+from snapshot_export import snapshot_exporter
+from events import event_broker
+from search import search_clients
+from replicas import read_your_writes, replica_reads, replica_router
+from metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    Exposition,
+    pool_metrics,
+    render_cache_metrics,
+    request_metrics
+)
+from validators import CompiledSchema
+from serializers import (
+    CLIENT_COLUMNS,
+    PAYMENT_BLOCK_COLUMNS,
+    dump_client_block_history,
+    dump_client_status,
+    dump_clients,
+    dump_payment_block,
+    dump_payment_blocks,
+    json_line,
+    json_response
+)
+from pagination import (
+    TOTAL_EXACT,
+    TOTAL_MODES,
+    InvalidCursorError,
+    apply_keyset,
+    count_rows,
+    encode_cursor
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,18 +66,143 @@ logger = logging.getLogger(__name__)
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
 # Schema instances for request validation and response serialization
-block_payment_schema = BlockPaymentSchema()
-unblock_payment_schema = UnblockPaymentSchema()
-client_status_schema = ClientStatusSchema()
-client_block_history_schema = ClientBlockHistorySchema()
+block_payment_validator = CompiledSchema(BlockPaymentSchema)
+unblock_payment_validator = CompiledSchema(UnblockPaymentSchema)
+batch_status_request_validator = CompiledSchema(BatchStatusRequestSchema)
+bulk_block_payment_validator = CompiledSchema(BulkBlockPaymentSchema)
+bulk_unblock_payment_validator = CompiledSchema(BulkUnblockPaymentSchema)
 payment_block_schema = PaymentBlockSchema()
 error_schema = ErrorSchema()
 
+# Number of rows fetched per round-trip when streaming block history
+HISTORY_STREAM_BATCH_SIZE = 500
+
+# Default and maximum number of changes returned by the change feed
+CHANGES_DEFAULT_LIMIT = 100
+CHANGES_MAX_LIMIT = 1000
+
+# Event stream settings: default and maximum long-poll wait (seconds), SSE reconnect delay (ms)
+EVENTS_POLL_TIMEOUT = 25
+EVENTS_MAX_POLL_TIMEOUT = 60
+EVENTS_RETRY_MS = 3000
+
+def _blocks_changed(client_identifiers):
+    """Propagate committed block/unblock changes to the status cache, the snapshot and event subscribers"""
+    for client_identifier in client_identifiers:
+        status_cache.invalidate(client_identifier)
+    snapshot_exporter.request_rebuild()
+    event_broker.wake()
+
+def _etag(*parts, vary_on_query=False):
+    """Build a weak ETag value from version parts (and the query string, if it shapes the response)"""
+    if vary_on_query:
+        parts += (hashlib.blake2b(request.query_string, digest_size=6).hexdigest(),)
+    return "-".join(str(part) for part in parts)
+
+def _with_etag(response, etag):
+    """Attach a weak ETag to a response"""
+    response.set_etag(etag, weak=True)
+    return response
+
+def _not_modified(etag):
+    """Return a 304 response if the client already holds the current representation"""
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        return _with_etag(Response(status=304), etag)
+    return None
+
+def _listing_etag(prefix):
+    """
+    Weak ETag of the block and client listings, or None when no stable validator exists
+
+    Based on the latest change_seq, which follows commit order: every change to a block, and to
+    the listed fields of a client (created, blocked or unblocked), commits with a new change_seq.
+    On PostgreSQL a change_seq at or above the feed watermark may still be overtaken by an older
+    transaction, so no ETag is issued until those transactions finish. Must be read before the
+    listing queries: a validator newer than the data it labels could later produce a stale 304.
+    """
+    watermark = ChangeSequence.watermark()
+    if watermark is None:
+        last_change = db.session.query(func.max(PaymentBlock.change_seq)).scalar()
+    else:
+        last_change, watermark = db.session.query(func.max(PaymentBlock.change_seq), watermark).one()
+        if last_change is not None and last_change >= watermark:
+            return None
+    return _etag(prefix, last_change or 0, vary_on_query=True)
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({"status": "healthy"}), 200
 
+@api_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Request, connection pool and cache metrics in Prometheus text format
+    ---
+    tags:
+      - System
+    responses:
+      200:
+        description: Per-endpoint latency histograms, DB and serialization time, response counts by status and in-flight requests
+    """
+    exposition = Exposition()
+    request_metrics.render(exposition)
+    pool_metrics.render(exposition, db.engine)
+    replica_router.render(exposition)
+    render_cache_metrics(exposition, {"status": status_cache.stats()})
+    return Response(exposition.render(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
+
+@api_bp.route('/metrics/cache', methods=['GET'])
+def cache_metrics():
+    """
+    Client status cache counters
+    ---
+    tags:
+      - System
+    responses:
+      200:
+        description: Hit, miss and eviction counters of the status cache
+    """
+    return jsonify({"status_cache": status_cache.stats()}), 200
+
+@api_bp.route('/metrics/pool', methods=['GET'])
+def pool_metrics_endpoint():
+    """
+    Database connection pool metrics
+    ---
+    tags:
+      - System
+    responses:
+      200:
+        description: Pool occupancy, checkout wait histogram and pre-ping failures, read replica health
+    """
+    return jsonify({"pool": pool_metrics.stats(db.engine), **replica_router.stats()}), 200
+
+@api_bp.route('/stats', methods=['GET'])
+@replica_reads
+def get_block_stats():
+    """
+    Block statistics for the monitoring dashboard
+    ---
+    tags:
+      - System
+    responses:
+      200:
+        description: Client and block totals, active blocks by type and reason, blocks created in the last 7 days
+      500:
+        description: Server error
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    try:
+        return json_response(block_stats()), 200
+    
+    except SQLAlchemyError as err:
+        logger.error(f"Database error while collecting block statistics: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Database error", "details": str(err)})), 500
+
 @api_bp.route('/clients/<client_identifier>/block', methods=['POST'])
 def block_client_payments(client_identifier):
     """
@@ -72,6 +241,12 @@ def block_client_payments(client_identifier):
           application/json:
             schema:
               $ref: '#/components/schemas/ErrorSchema'
+      409:
+        description: Client already has an active block
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
       500:
         description: Server error
         content:
@@ -87,33 +262,33 @@ def block_client_payments(client_identifier):
         
         # Override client_identifier from URL
         data['client_identifier'] = client_identifier
-        validated_data = block_payment_schema.load(data)
+        validated_data = block_payment_validator.load(data)
         
-        # Find or create client
-        client, created = get_or_create_client(validated_data['client_identifier'])
-        if created:
-            client.name = validated_data.get('client_identifier')  # Use identifier as name if not provided
-            db.session.add(client)
-        
-        # Check if client already has an active block
-        if client.is_blocked:
-            return jsonify(error_schema.dump({
-                "error": "Client already blocked",
-                "details": f"Client {client_identifier} already has an active payment block"
-            })), 409
+        # Find or create client (the identifier is used as the name of new clients)
+        client, _ = get_or_create_client(validated_data['client_identifier'])
         
-        # Create new payment block
-        payment_block = PaymentBlock(
+        # Create new payment block; the partial unique index rejects a second active block
+        payment_block = create_active_block(
             client_id=client.id,
             reason=validated_data['reason'],
             details=validated_data.get('details'),
-            blocked_by=validated_data['blocked_by']
+            blocked_by=validated_data['blocked_by'],
+            expires_at=validated_data.get('expires_at')
         )
+        if payment_block is None:
+            db.session.rollback()
+            return jsonify(error_schema.dump({
+                "error": "Client already blocked",
+                "details": f"Client {client_identifier} already has an active payment block"
+            })), 409
         
-        db.session.add(payment_block)
+        touch_clients([client.id])
+        response_data = payment_block_schema.dump(payment_block)
+        record_block_events(BlockEvent.BLOCK_CREATED, [(client_identifier, response_data)])
         db.session.commit()
+        _blocks_changed([client_identifier])
         
-        return jsonify(payment_block_schema.dump(payment_block)), 201
+        return jsonify(response_data), 201
     
     except ValidationError as err:
         return jsonify(error_schema.dump({"error": "Validation error", "details": str(err)})), 400
@@ -180,7 +355,7 @@ def unblock_client_payments(client_identifier):
         
         # Override client_identifier from URL
         data['client_identifier'] = client_identifier
-        validated_data = unblock_payment_schema.load(data)
+        validated_data = unblock_payment_validator.load(data)
         
         # Find client
         client = Client.query.filter_by(client_identifier=client_identifier).first()
@@ -190,23 +365,30 @@ def unblock_client_payments(client_identifier):
                 "details": f"No client found with identifier {client_identifier}"
             })), 404
         
-        # Find active block
-        active_block = client.active_block
-        if not active_block:
+        # Lock the active block, as the bulk unblock does: a concurrent unblock or the expiry
+        # sweeper that got there first leaves no active row, so the removal is recorded once
+        active_block = PaymentBlock.query.filter(
+            PaymentBlock.client_id == client.id, PaymentBlock.active_predicate()
+        ).with_for_update().populate_existing().first()
+        # unblock() updates only a still-active row; SQLite has no row locks, so it is the final check
+        if not active_block or not active_block.is_active or not active_block.unblock(
+            unblocked_by=validated_data['unblocked_by'],
+            reason=validated_data.get('reason')
+        ):
+            db.session.rollback()
             return jsonify(error_schema.dump({
                 "error": "No active block",
                 "details": f"Client {client_identifier} does not have an active payment block"
             })), 404
         
-        # Unblock the payment
-        active_block.unblock(
-            unblocked_by=validated_data['unblocked_by'],
-            reason=validated_data.get('reason')
-        )
+        touch_clients([client.id])
+        response_data = payment_block_schema.dump(active_block)
+        record_block_events(BlockEvent.BLOCK_REMOVED, [(client_identifier, response_data)])
         
         db.session.commit()
+        _blocks_changed([client_identifier])
         
-        return jsonify(payment_block_schema.dump(active_block)), 200
+        return jsonify(response_data), 200
     
     except ValidationError as err:
         return jsonify(error_schema.dump({"error": "Validation error", "details": str(err)})), 400
@@ -220,7 +402,254 @@ def unblock_client_payments(client_identifier):
         logger.error(f"Unexpected error while unblocking client payments: {str(err)}")
         return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
 
+@api_bp.route('/clients/block:batch', methods=['POST'])
+def bulk_block_client_payments():
+    """
+    Block payments for many clients in a single transaction
+    ---
+    tags:
+      - Payment Blocks
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            $ref: '#/components/schemas/BulkBlockPaymentSchema'
+    responses:
+      200:
+        description: Per-item results (201 blocked, 400 invalid item, 409 already blocked)
+      400:
+        description: Invalid request data
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+      500:
+        description: Server error
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify(error_schema.dump({"error": "No JSON data provided"})), 400
+        
+        items = bulk_block_payment_validator.load(data)['items']
+        results, valid_items = _validate_bulk_items(items, block_payment_validator)
+        
+        # Resolve all clients with one IN query and create the missing ones in bulk
+        client_ids = get_or_create_clients(item['client_identifier'] for _, item in valid_items)
+        
+        # A client may appear only once per batch; repeats are reported as conflicts
+        rows = {}
+        for index, item in valid_items:
+            client_id = client_ids[item['client_identifier']]
+            if client_id in rows:
+                results[index] = _bulk_conflict(item['client_identifier'])
+                continue
+            rows[client_id] = (index, {
+                'client_id': client_id,
+                'reason': item['reason'],
+                'details': item.get('details'),
+                'blocked_by': item['blocked_by'],
+                'expires_at': item.get('expires_at')
+            })
+        
+        # Insert all blocks with one executemany statement
+        created_blocks = create_active_blocks([row for _, row in rows.values()])
+        
+        for client_id, (index, row) in rows.items():
+            payment_block = created_blocks.get(client_id)
+            identifier = items[index]['client_identifier']
+            if payment_block is None:
+                results[index] = _bulk_conflict(identifier)
+            else:
+                results[index] = {
+                    "client_identifier": identifier,
+                    "status": 201,
+                    "block": payment_block_schema.dump(payment_block)
+                }
+        touch_clients(created_blocks)
+        record_block_events(BlockEvent.BLOCK_CREATED, [
+            (result["client_identifier"], result["block"]) for result in results if result["status"] == 201
+        ])
+        
+        db.session.commit()
+        _blocks_changed(item['client_identifier'] for _, item in valid_items)
+        
+        return jsonify({"results": results}), 200
+    
+    except ValidationError as err:
+        return jsonify(error_schema.dump({"error": "Validation error", "details": str(err)})), 400
+    
+    except SQLAlchemyError as err:
+        db.session.rollback()
+        logger.error(f"Database error while blocking client payments in bulk: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Database error", "details": str(err)})), 500
+    
+    except Exception as err:
+        logger.error(f"Unexpected error while blocking client payments in bulk: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
+
+@api_bp.route('/clients/unblock:batch', methods=['POST'])
+def bulk_unblock_client_payments():
+    """
+    Unblock payments for many clients in a single transaction
+    ---
+    tags:
+      - Payment Blocks
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            $ref: '#/components/schemas/BulkUnblockPaymentSchema'
+    responses:
+      200:
+        description: Per-item results (200 unblocked, 400 invalid item, 404 client not found or no active block)
+      400:
+        description: Invalid request data
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+      500:
+        description: Server error
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify(error_schema.dump({"error": "No JSON data provided"})), 400
+        
+        items = bulk_unblock_payment_validator.load(data)['items']
+        results, valid_items = _validate_bulk_items(items, unblock_payment_validator)
+        identifiers = [item['client_identifier'] for _, item in valid_items]
+        
+        # Resolve active blocks of all clients with one IN query, locking them for the update
+        active_blocks = {}
+        if identifiers:
+            rows = db.session.query(Client.client_identifier, PaymentBlock).join(
+                PaymentBlock,
+                and_(PaymentBlock.client_id == Client.id, PaymentBlock.active_predicate())
+            ).filter(Client.client_identifier.in_(identifiers)).with_for_update(of=PaymentBlock).all()
+            active_blocks = dict(rows)
+        
+        # Tell unknown clients apart from clients without an active block, as the single unblock does
+        missing = set(identifiers).difference(active_blocks)
+        known_clients = set()
+        if missing:
+            known_clients = {identifier for identifier, in db.session.query(Client.client_identifier).filter(
+                Client.client_identifier.in_(missing)
+            )}
+        
+        unblocked_at = datetime.utcnow()
+        updates = []
+        for index, item in valid_items:
+            identifier = item['client_identifier']
+            active_block = active_blocks.pop(identifier, None)
+            if active_block is None and identifier in missing and identifier not in known_clients:
+                results[index] = {
+                    "client_identifier": identifier,
+                    "status": 404,
+                    "error": error_schema.dump({
+                        "error": "Client not found",
+                        "details": f"No client found with identifier {identifier}"
+                    })
+                }
+                continue
+            if active_block is None:
+                results[index] = {
+                    "client_identifier": identifier,
+                    "status": 404,
+                    "error": error_schema.dump({
+                        "error": "No active block",
+                        "details": f"Client {identifier} does not have an active payment block"
+                    })
+                }
+                continue
+            
+            updates.append({
+                'id': active_block.id,
+                'is_active': False,
+                'unblocked_at': unblocked_at,
+                'unblocked_by': item['unblocked_by'],
+                'unblock_reason': item.get('reason')
+            })
+            results[index] = {"client_identifier": identifier, "status": 200, "block": active_block}
+        
+        # Update all blocks with one executemany statement
+        if updates:
+            for row, change_seq in zip(updates, ChangeSequence.allocate(len(updates))):
+                row['change_seq'] = change_seq
+            db.session.execute(update(PaymentBlock), updates)
+            touch_clients(result["block"].client_id for result in results if result.get("status") == 200)
+            StatCounter.record_unblocked(
+                result["block"].reason for result in results if result.get("status") == 200
+            )
+        
+        for result in results:
+            if result.get("status") == 200:
+                result["block"] = payment_block_schema.dump(result["block"])
+        record_block_events(BlockEvent.BLOCK_REMOVED, [
+            (result["client_identifier"], result["block"]) for result in results if result["status"] == 200
+        ])
+        
+        db.session.commit()
+        _blocks_changed(identifiers)
+        
+        return jsonify({"results": results}), 200
+    
+    except ValidationError as err:
+        return jsonify(error_schema.dump({"error": "Validation error", "details": str(err)})), 400
+    
+    except SQLAlchemyError as err:
+        db.session.rollback()
+        logger.error(f"Database error while unblocking client payments in bulk: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Database error", "details": str(err)})), 500
+    
+    except Exception as err:
+        logger.error(f"Unexpected error while unblocking client payments in bulk: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
+
+def _validate_bulk_items(items, validator):
+    """
+    Validate every item of a bulk request in one pass
+    
+    Returns the per-item result list (with 400 entries for invalid items) and
+    the list of (index, validated_data) pairs for the valid ones.
+    """
+    results = [None] * len(items)
+    valid_items = []
+    for index, item in enumerate(items):
+        try:
+            valid_items.append((index, validator.load(item)))
+        except ValidationError as err:
+            results[index] = {
+                "client_identifier": item.get('client_identifier'),
+                "status": 400,
+                "error": error_schema.dump({"error": "Validation error", "details": str(err)})
+            }
+    return results, valid_items
+
+def _bulk_conflict(client_identifier):
+    """Build the per-item result for a client that already has an active block"""
+    return {
+        "client_identifier": client_identifier,
+        "status": 409,
+        "error": error_schema.dump({
+            "error": "Client already blocked",
+            "details": f"Client {client_identifier} already has an active payment block"
+        })
+    }
+
 @api_bp.route('/clients/<client_identifier>/status', methods=['GET'])
+@replica_reads
 def check_client_status(client_identifier):
     """
     Check if a client's payments are blocked
@@ -254,6 +683,23 @@ def check_client_status(client_identifier):
               $ref: '#/components/schemas/ErrorSchema'
     """
     try:
+        # Serve from the status cache when possible (read-your-writes requests read the primary)
+        cached = None if read_your_writes() else status_cache.get(client_identifier)
+        if cached is not None:
+            etag, status = cached
+            return _not_modified(etag) or (_with_etag(json_response(status), etag), 200)
+        cache_version = status_cache.version()
+        
+        # Answer conditional requests from the client version alone
+        if request.if_none_match:
+            version = db.session.query(Client.id, Client.version).filter_by(
+                client_identifier=client_identifier
+            ).first()
+            if version is not None:
+                not_modified = _not_modified(_etag("s", *version))
+                if not_modified:
+                    return not_modified
+        
         # Find client
         client = Client.query.filter_by(client_identifier=client_identifier).first()
         if not client:
@@ -263,13 +709,11 @@ def check_client_status(client_identifier):
             })), 404
         
         # Prepare response
-        response_data = {
-            "client_identifier": client.client_identifier,
-            "is_blocked": client.is_blocked,
-            "block_details": client.active_block if client.is_blocked else None
-        }
+        etag = _etag("s", client.id, client.version)
+        status = dump_client_status(client.client_identifier, client.active_block)
+        status_cache.set(client_identifier, (etag, status), version=cache_version)
         
-        return jsonify(client_status_schema.dump(response_data)), 200
+        return _with_etag(json_response(status), etag), 200
     
     except SQLAlchemyError as err:
         logger.error(f"Database error while checking client status: {str(err)}")
@@ -279,7 +723,107 @@ def check_client_status(client_identifier):
         logger.error(f"Unexpected error while checking client status: {str(err)}")
         return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
 
+@api_bp.route('/clients/status:batch', methods=['POST'])
+@replica_reads
+def check_client_status_batch():
+    """
+    Check the block status of many clients at once
+    ---
+    tags:
+      - Payment Blocks
+    requestBody:
+      required: true
+      content:
+        application/json:
+          schema:
+            $ref: '#/components/schemas/BatchStatusRequestSchema'
+    responses:
+      200:
+        description: Statuses of the known clients and the list of unknown identifiers
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                statuses:
+                  type: object
+                  additionalProperties:
+                    $ref: '#/components/schemas/ClientStatusSchema'
+                not_found:
+                  type: array
+                  items:
+                    type: string
+      400:
+        description: Invalid request data
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+      500:
+        description: Server error
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify(error_schema.dump({"error": "No JSON data provided"})), 400
+        
+        validated_data = batch_status_request_validator.load(data)
+        identifiers = list(dict.fromkeys(validated_data['client_identifiers']))
+        
+        # Serve what we can from the status cache (read-your-writes requests read the primary)
+        statuses = {}
+        missing = []
+        bypass_cache = read_your_writes()
+        for identifier in identifiers:
+            cached = None if bypass_cache else status_cache.get(identifier)
+            if cached is not None:
+                statuses[identifier] = cached[1]
+            else:
+                missing.append(identifier)
+        
+        if missing:
+            cache_version = status_cache.version()
+            
+            # Resolve all remaining clients and their active blocks in one query
+            rows = db.session.query(Client.client_identifier, Client.id, Client.version, PaymentBlock).outerjoin(
+                PaymentBlock,
+                and_(PaymentBlock.client_id == Client.id, PaymentBlock.active_predicate())
+            ).filter(Client.client_identifier.in_(missing)).all()
+            
+            found = {}
+            for identifier, client_id, version, active_block in rows:
+                if identifier not in found or found[identifier][2] is None:
+                    found[identifier] = (client_id, version, active_block)
+            
+            for identifier, (client_id, version, active_block) in found.items():
+                status = dump_client_status(identifier, active_block)
+                status_cache.set(identifier, (_etag("s", client_id, version), status), version=cache_version)
+                statuses[identifier] = status
+        
+        response = {
+            "statuses": statuses,
+            "not_found": [identifier for identifier in identifiers if identifier not in statuses]
+        }
+        
+        return json_response(response), 200
+    
+    except ValidationError as err:
+        return jsonify(error_schema.dump({"error": "Validation error", "details": str(err)})), 400
+    
+    except SQLAlchemyError as err:
+        logger.error(f"Database error while checking client statuses in batch: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Database error", "details": str(err)})), 500
+    
+    except Exception as err:
+        logger.error(f"Unexpected error while checking client statuses in batch: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
+
 @api_bp.route('/clients/<client_identifier>/history', methods=['GET'])
+@replica_reads
 def get_client_block_history(client_identifier):
     """
     Get payment block history for a specific client
@@ -292,6 +836,24 @@ def get_client_block_history(client_identifier):
         required: true
         schema:
           type: string
+      - name: format
+        in: query
+        schema:
+          type: string
+          enum: [json, ndjson]
+          default: json
+        description: Response format; ndjson streams one block per line
+      - name: since
+        in: query
+        schema:
+          type: string
+          format: date-time
+        description: Only return blocks created at or after this time
+      - name: limit
+        in: query
+        schema:
+          type: integer
+        description: Maximum number of blocks to return
     responses:
       200:
         description: Client block history retrieved successfully
@@ -299,6 +861,15 @@ def get_client_block_history(client_identifier):
           application/json:
             schema:
               $ref: '#/components/schemas/ClientBlockHistorySchema'
+          application/x-ndjson:
+            schema:
+              $ref: '#/components/schemas/PaymentBlockSchema'
+      400:
+        description: Invalid query parameters
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
       404:
         description: Client not found
         content:
@@ -313,6 +884,16 @@ def get_client_block_history(client_identifier):
               $ref: '#/components/schemas/ErrorSchema'
     """
     try:
+        # Answer conditional requests from the client version alone
+        if request.if_none_match:
+            version = db.session.query(Client.id, Client.version).filter_by(
+                client_identifier=client_identifier
+            ).first()
+            if version is not None:
+                not_modified = _not_modified(_etag("h", *version, vary_on_query=True))
+                if not_modified:
+                    return not_modified
+        
         # Find client
         client = Client.query.filter_by(client_identifier=client_identifier).first()
         if not client:
@@ -320,15 +901,41 @@ def get_client_block_history(client_identifier):
                 "error": "Client not found",
                 "details": f"No client found with identifier {client_identifier}"
             })), 404
+        etag = _etag("h", client.id, client.version, vary_on_query=True)
+        
+        # Parse optional filters
+        limit = request.args.get('limit')
+        since = request.args.get('since')
+        try:
+            limit = int(limit) if limit is not None else None
+            since = datetime.fromisoformat(since) if since else None
+        except ValueError as err:
+            return jsonify(error_schema.dump({"error": "Invalid query parameters", "details": str(err)})), 400
+        if limit is not None and limit <= 0:
+            return jsonify(error_schema.dump({
+                "error": "Invalid query parameters",
+                "details": "limit must be a positive integer"
+            })), 400
+        
+        # Select plain columns: rows are serialized without building ORM objects
+        history_query = db.session.query(*PAYMENT_BLOCK_COLUMNS).filter(PaymentBlock.client_id == client.id)
+        if since:
+            history_query = history_query.filter(PaymentBlock.blocked_at >= since)
+        history_query = history_query.order_by(PaymentBlock.blocked_at, PaymentBlock.id)
+        if limit:
+            history_query = history_query.limit(limit)
+        
+        # Stream one block per line without materializing the whole history
+        if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+            return _with_etag(Response(
+                stream_with_context(_stream_block_history(db.session.get_bind(), history_query.statement)),
+                mimetype='application/x-ndjson'
+            ), etag)
         
         # Prepare response
-        response_data = {
-            "client_identifier": client.client_identifier,
-            "client_name": client.name,
-            "block_history": client.payment_blocks
-        }
+        response_data = dump_client_block_history(client.client_identifier, client.name, history_query.all())
         
-        return jsonify(client_block_history_schema.dump(response_data)), 200
+        return _with_etag(json_response(response_data), etag), 200
     
     except SQLAlchemyError as err:
         logger.error(f"Database error while retrieving client block history: {str(err)}")
@@ -338,7 +945,23 @@ def get_client_block_history(client_identifier):
         logger.error(f"Unexpected error while retrieving client block history: {str(err)}")
         return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
 
+def _stream_block_history(engine, statement):
+    """Yield NDJSON lines for a block history query using a server-side cursor"""
+    # The request session is removed when the view returns, before the body is sent, so the
+    # stream reads on its own connection and returns it to the pool when the stream ends
+    connection = engine.connect()
+    try:
+        for block in connection.execution_options(yield_per=HISTORY_STREAM_BATCH_SIZE).execute(statement):
+            yield json_line(dump_payment_block(block))
+    except SQLAlchemyError as err:
+        # Headers are already sent, so the stream can only be cut short
+        logger.error(f"Database error while streaming client block history: {str(err)}")
+        raise
+    finally:
+        connection.close()
+
 @api_bp.route('/blocks', methods=['GET'])
+@replica_reads
 def list_payment_blocks():
     """
     List all payment blocks with filtering options
@@ -368,7 +991,19 @@ def list_payment_blocks():
         schema:
           type: integer
           default: 0
-        description: Offset for pagination
+        description: Offset for pagination (ignored when a cursor is given)
+      - name: cursor
+        in: query
+        schema:
+          type: string
+        description: Opaque cursor from next_cursor of the previous page
+      - name: total
+        in: query
+        schema:
+          type: string
+          enum: [exact, estimate, none]
+          default: exact
+        description: How to compute the total number of matching blocks
     responses:
       200:
         description: Payment blocks retrieved successfully
@@ -383,10 +1018,22 @@ def list_payment_blocks():
                     $ref: '#/components/schemas/PaymentBlockSchema'
                 total:
                   type: integer
+                  nullable: true
+                total_is_estimate:
+                  type: boolean
                 limit:
                   type: integer
                 offset:
                   type: integer
+                next_cursor:
+                  type: string
+                  nullable: true
+      400:
+        description: Invalid cursor or total mode
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
       500:
         description: Server error
         content:
@@ -400,9 +1047,16 @@ def list_payment_blocks():
         reason = request.args.get('reason')
         limit = min(int(request.args.get('limit', 50)), 100)  # Cap at 100
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+        total_mode = request.args.get('total', TOTAL_EXACT)
+        if total_mode not in TOTAL_MODES:
+            return jsonify(error_schema.dump({
+                "error": "Invalid total mode",
+                "details": f"total must be one of: {', '.join(TOTAL_MODES)}"
+            })), 400
         
-        # Build query
-        query = PaymentBlock.query.join(Client)
+        # Build query over plain columns: rows are serialized without building ORM objects
+        query = db.session.query(*PAYMENT_BLOCK_COLUMNS).join(Client, PaymentBlock.client_id == Client.id)
         
         # Apply filters
         if active is not None:
@@ -417,21 +1071,41 @@ def list_payment_blocks():
                 # Invalid reason - ignore filter
                 pass
         
+        # Apply pagination: keyset when a cursor is given, offset otherwise
+        page_query = apply_keyset(query, PaymentBlock.blocked_at, PaymentBlock.id, cursor)
+        if cursor:
+            offset = 0
+        
+        # The validator is read only for valid requests, and answers conditional ones alone
+        etag = _listing_etag("l")
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        
         # Get total count before pagination
-        total = query.count()
+        total, total_is_estimate = count_rows(query, total_mode)
+        blocks = page_query.limit(limit + 1).offset(offset).all()
         
-        # Apply pagination
-        blocks = query.order_by(PaymentBlock.blocked_at.desc()).limit(limit).offset(offset).all()
+        next_cursor = None
+        if len(blocks) > limit:
+            blocks = blocks[:limit]
+            next_cursor = encode_cursor(blocks[-1].blocked_at, blocks[-1].id)
         
         # Prepare response
         response = {
-            "blocks": payment_block_schema.dump(blocks, many=True),
+            "blocks": dump_payment_blocks(blocks),
             "total": total,
+            "total_is_estimate": total_is_estimate,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
         
-        return jsonify(response), 200
+        response = json_response(response)
+        return (_with_etag(response, etag) if etag else response), 200
+    
+    except InvalidCursorError as err:
+        return jsonify(error_schema.dump({"error": "Invalid cursor", "details": str(err)})), 400
     
     except SQLAlchemyError as err:
         logger.error(f"Database error while listing payment blocks: {str(err)}")
@@ -440,3 +1114,324 @@ def list_payment_blocks():
     except Exception as err:
         logger.error(f"Unexpected error while listing payment blocks: {str(err)}")
         return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
+
+@api_bp.route('/clients', methods=['GET'])
+@replica_reads
+def list_clients():
+    """
+    List clients with their block flag
+    ---
+    tags:
+      - Clients
+    parameters:
+      - name: q
+        in: query
+        schema:
+          type: string
+        description: >
+          Case-insensitive substring of the client name or identifier; results are
+          ranked by exact identifier, prefix matches and then similarity
+      - name: blocked
+        in: query
+        schema:
+          type: boolean
+        description: Only clients with (true) or without (false) an active block
+      - name: limit
+        in: query
+        schema:
+          type: integer
+          default: 50
+          maximum: 100
+      - name: offset
+        in: query
+        schema:
+          type: integer
+          default: 0
+      - name: total
+        in: query
+        schema:
+          type: string
+          enum: [exact, estimate, none]
+          default: exact
+    responses:
+      200:
+        description: Page of clients ordered by id (by relevance when q is given)
+      400:
+        description: Invalid total mode
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+      500:
+        description: Server error
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    try:
+        term = request.args.get('q', '').strip()
+        blocked = request.args.get('blocked')
+        limit = min(int(request.args.get('limit', 50)), 100)  # Cap at 100
+        offset = int(request.args.get('offset', 0))
+        total_mode = request.args.get('total', TOTAL_EXACT)
+        if total_mode not in TOTAL_MODES:
+            return jsonify(error_schema.dump({
+                "error": "Invalid total mode",
+                "details": f"total must be one of: {', '.join(TOTAL_MODES)}"
+            })), 400
+        
+        # The validator is read only for valid requests, and answers conditional ones alone
+        etag = _listing_etag("c")
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        
+        # is_blocked is an EXISTS probe on the active block index, so the page cost does not
+        # depend on how many historical blocks each client has
+        query = db.session.query(*CLIENT_COLUMNS)
+        if blocked is not None:
+            query = query.filter(Client.is_blocked if blocked.lower() == 'true' else ~Client.is_blocked)
+        
+        # Substring search goes through the trigram index (FTS5 on SQLite, pg_trgm on PostgreSQL)
+        order_by = (Client.id,)
+        if term:
+            query, order_by = search_clients(query, term)
+        
+        total, total_is_estimate = count_rows(query, total_mode)
+        clients = query.order_by(*order_by).limit(limit).offset(offset).all()
+        
+        response = {
+            "clients": dump_clients(clients),
+            "total": total,
+            "total_is_estimate": total_is_estimate,
+            "limit": limit,
+            "offset": offset
+        }
+        
+        response = json_response(response)
+        return (_with_etag(response, etag) if etag else response), 200
+    
+    except ValueError as err:
+        return jsonify(error_schema.dump({"error": "Invalid query parameters", "details": str(err)})), 400
+    
+    except SQLAlchemyError as err:
+        logger.error(f"Database error while listing clients: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Database error", "details": str(err)})), 500
+    
+    except Exception as err:
+        logger.error(f"Unexpected error while listing clients: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
+
+@api_bp.route('/changes', methods=['GET'])
+@replica_reads
+def list_block_changes():
+    """
+    Get payment blocks changed after a sequence number (incremental sync)
+    ---
+    tags:
+      - Payment Blocks
+    parameters:
+      - name: after
+        in: query
+        schema:
+          type: integer
+          default: 0
+        description: Sequence number of the last change already applied (last_seq of the previous page)
+      - name: limit
+        in: query
+        schema:
+          type: integer
+          default: 100
+        description: Maximum number of changes to return (at most 1000)
+    responses:
+      200:
+        description: Changes in ascending sequence order
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                changes:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      seq:
+                        type: integer
+                      client_identifier:
+                        type: string
+                      block:
+                        $ref: '#/components/schemas/PaymentBlockSchema'
+                last_seq:
+                  type: integer
+                has_more:
+                  type: boolean
+      400:
+        description: Invalid query parameters
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+      500:
+        description: Server error
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    try:
+        try:
+            after = int(request.args.get('after', 0))
+            limit = int(request.args.get('limit', CHANGES_DEFAULT_LIMIT))
+        except ValueError as err:
+            return jsonify(error_schema.dump({"error": "Invalid query parameters", "details": str(err)})), 400
+        if after < 0 or limit <= 0:
+            return jsonify(error_schema.dump({
+                "error": "Invalid query parameters",
+                "details": "after must be non-negative and limit must be a positive integer"
+            })), 400
+        limit = min(limit, CHANGES_MAX_LIMIT)
+        
+        # Range scan of ix_payment_blocks_change_seq: the cost depends on the number of changes only.
+        # A block changed several times since `after` is returned once, in its latest state.
+        query = db.session.query(Client.client_identifier, PaymentBlock).join(
+            PaymentBlock, PaymentBlock.client_id == Client.id
+        ).filter(PaymentBlock.change_seq > after)
+        # Changes at or above the watermark may still be joined by transactions that have not committed
+        watermark = ChangeSequence.watermark()
+        if watermark is not None:
+            query = query.filter(PaymentBlock.change_seq < watermark)
+        rows = query.order_by(PaymentBlock.change_seq).limit(limit + 1).all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return json_response({
+            "changes": [
+                {"seq": block.change_seq, "client_identifier": identifier, "block": dump_payment_block(block)}
+                for identifier, block in rows
+            ],
+            "last_seq": rows[-1][1].change_seq if rows else after,
+            "has_more": has_more
+        }), 200
+    
+    except SQLAlchemyError as err:
+        logger.error(f"Database error while listing block changes: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Database error", "details": str(err)})), 500
+    
+    except Exception as err:
+        logger.error(f"Unexpected error while listing block changes: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Server error", "details": str(err)})), 500
+
+@api_bp.route('/events', methods=['GET'])
+def stream_block_events():
+    """
+    Stream block and unblock events (Server-Sent Events or long-poll)
+    ---
+    tags:
+      - Payment Blocks
+    parameters:
+      - name: mode
+        in: query
+        schema:
+          type: string
+          enum: [sse, poll]
+          default: sse
+        description: sse keeps the connection open; poll returns as soon as events arrive or timeout expires
+      - name: Last-Event-ID
+        in: header
+        schema:
+          type: integer
+        description: Resume after this event id (sent automatically by EventSource on reconnect)
+      - name: after
+        in: query
+        schema:
+          type: integer
+        description: Resume after this event id (overrides Last-Event-ID)
+      - name: timeout
+        in: query
+        schema:
+          type: number
+          default: 25
+        description: Maximum wait in seconds in poll mode (at most 60)
+    responses:
+      200:
+        description: Event stream (sse) or a batch of events (poll)
+        content:
+          text/event-stream:
+            schema:
+              type: string
+          application/json:
+            schema:
+              type: object
+              properties:
+                events:
+                  type: array
+                  items:
+                    type: object
+                last_event_id:
+                  type: integer
+      400:
+        description: Invalid query parameters
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+      503:
+        description: The event broker could not read the last event id from the database
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ErrorSchema'
+    """
+    mode = request.args.get('mode', 'sse')
+    after = request.args.get('after', request.headers.get('Last-Event-ID'))
+    try:
+        after = int(after) if after not in (None, '') else None
+        timeout = min(float(request.args.get('timeout', EVENTS_POLL_TIMEOUT)), EVENTS_MAX_POLL_TIMEOUT)
+    except ValueError as err:
+        return jsonify(error_schema.dump({"error": "Invalid query parameters", "details": str(err)})), 400
+    if mode not in ('sse', 'poll'):
+        return jsonify(error_schema.dump({
+            "error": "Invalid query parameters",
+            "details": "mode must be one of: sse, poll"
+        })), 400
+    
+    try:
+        event_broker.start()
+    except Exception as err:
+        logger.error(f"Event stream unavailable: {str(err)}")
+        return jsonify(error_schema.dump({"error": "Event stream unavailable", "details": str(err)})), 503
+    
+    # Without a resume point a subscriber only receives events from now on
+    if after is None:
+        after = event_broker.last_event_id
+    
+    if mode == 'poll':
+        events = event_broker.read(after, timeout=max(timeout, 0))
+        last_event_id = events[-1].id if events else after
+        body = '{"events":[%s],"last_event_id":%d}' % (
+            ",".join('{"id":%d,"event":"%s","data":%s}' % (event.id, event.event_type, event.data) for event in events),
+            last_event_id
+        )
+        response = Response(body, mimetype='application/json')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    response = Response(stream_with_context(_stream_events(after)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    # Disable response buffering in nginx so events are delivered immediately
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _stream_events(after):
+    """Yield SSE frames after the given event id, with comments as keep-alive heartbeats"""
+    yield f"retry: {EVENTS_RETRY_MS}\n\n"
+    while True:
+        events = event_broker.read(after, timeout=event_broker.heartbeat)
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        yield "".join(event.frame for event in events)
+        after = events[-1].id
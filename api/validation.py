@@ -1,3 +1,5 @@
+from validators import EMAIL_RE
+
 def validate_block_request(data):
     """Validate block request data"""
     errors = {}
@@ -48,9 +50,7 @@ def validate_client_request(data):
     
     # Validate email if provided
     if 'email' in data and data['email']:
-        import re
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, data['email']):
+        if not EMAIL_RE.match(data['email']):
             errors['email'] = 'Invalid email format'
         elif len(data['email']) > 200:
             errors['email'] = 'Email is too long (max 200 characters)'
@@ -3,44 +3,92 @@ import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
+from werkzeug.utils import import_string
+
+from config import PROFILES
+from replicas import RoutingSession
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Define the base class for SQLAlchemy models
 class Base(DeclarativeBase):
     pass
 
-# Initialize SQLAlchemy with the base class
-db = SQLAlchemy(model_class=Base)
+# Initialize SQLAlchemy with the base class (bound to an application in create_app);
+# the session reads from a replica in views marked with replicas.replica_reads
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 
-# Create Flask application
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET")
+# Blueprints are imported only when an application is created, so importing this
+# module stays cheap and free of side effects
+BLUEPRINTS = (
+    "api:api_bp",
+    "commands:commands_bp",
+    "routes:pages_bp",
+)
 
-# Configure database connection
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+def create_app(config=None, overrides=None):
+    """
+    Create and configure the Flask application
 
-# Initialize the app with SQLAlchemy
-db.init_app(app)
+    Args:
+        config: Profile name ("production", "development", "test") or a config
+                object; defaults to the APP_CONFIG environment variable or "production"
+        overrides (dict, optional): Config values applied on top of the profile
 
-# Import and register blueprints after app creation to avoid circular imports
-with app.app_context():
-    from api import api_bp
-    app.register_blueprint(api_bp)
+    The database is not touched here unless the profile sets AUTO_CREATE_SCHEMA;
+    in production the schema is created by the explicit `flask init-db` step.
+    """
+    if config is None:
+        config = os.environ.get("APP_CONFIG", "production")
+    if isinstance(config, str):
+        config = PROFILES[config]
 
-    # Import models and create tables
-    import models
-    db.create_all()
-    logger.debug("Database tables created")
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if overrides:
+        app.config.update(overrides)
+
+    logging.basicConfig(level=app.config["LOG_LEVEL"])
+
+    # Initialize the app with SQLAlchemy and read replicas, and instrument the connection pool and requests
+    db.init_app(app)
+
+    from replicas import replica_router
+    replica_router.init_app(app)
+
+    from metrics import pool_metrics, request_metrics
+    with app.app_context():
+        pool_metrics.instrument(db.engine)
+        request_metrics.init_app(app, db.engine, *replica_router.engines)
+
+    from cache import status_cache
+    status_cache.configure(
+        max_size=app.config["STATUS_CACHE_MAX_SIZE"],
+        ttl=app.config["STATUS_CACHE_TTL"],
+    )
 
-# Import routes after app and database initialization
-from routes import *
+    from snapshot_export import snapshot_exporter
+    snapshot_exporter.init_app(app)
 
-logger.debug("Application initialized successfully")
+    from events import event_broker
+    event_broker.init_app(app)
+
+    from expiry import expiry_sweeper
+    expiry_sweeper.init_app(app)
+
+    # Register the API, CLI commands (flask import-blocks, flask init-db, ...) and pages
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(import_string(blueprint))
+
+    if app.config["AUTO_CREATE_SCHEMA"]:
+        with app.app_context():
+            create_schema()
+
+    logger.debug("Application initialized successfully")
+    return app
+
+def create_schema():
+    """Create missing tables and indexes (requires an application context)"""
+    import models  # noqa: F401  (register all tables in the metadata)
+    db.create_all()
+    logger.debug("Database tables created")
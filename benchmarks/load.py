@@ -0,0 +1,386 @@
+"""
+Нагрузочный замер эндпоинтов API с сохранением базовых результатов
+
+Команда run заполняет базу SQLite или PostgreSQL заданным числом клиентов и блокировок,
+затем по очереди нагружает каждый эндпоинт /api/v1 несколькими параллельными воркерами
+(через тестовый клиент Flask или по HTTP, например gunicorn на localhost) и выводит JSON
+с p50/p95/p99 задержки и числом запросов в секунду по каждому эндпоинту.
+Команда compare сравнивает результат с базовым и завершается с кодом 1 при регрессии
+или при эндпоинте, которого нет в базовом отчете; отчеты, снятые с разными параметрами
+(число клиентов, блокировок, воркеров, запросов, транспорт, СУБД), не сравниваются.
+
+Запуск из корня репозитория:
+    python -m benchmarks.load run [--clients 2000] [--blocks-per-client 5] [--workers 8]
+                                  [--requests 200] [--database-url URL] [--base-url URL]
+                                  [--output results.json]
+    python -m benchmarks.load compare benchmarks/baselines/sqlite.json results.json [--threshold 0.25]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, create_schema, db  # noqa: E402
+from config import engine_options  # noqa: E402
+from models import BlockReason, ChangeSequence, Client, PaymentBlock  # noqa: E402
+from pagination import encode_cursor  # noqa: E402
+
+# Размер пакета строк при заполнении базы
+SEED_CHUNK_SIZE = 5000
+
+# Число клиентов в пакетных запросах
+BATCH_SIZE = 10
+
+
+def client_identifier(index):
+    return f"77{index:08d}"
+
+
+def seed(clients, blocks_per_client):
+    """
+    Заполняет пустую базу (требуется контекст приложения)
+
+    У каждого клиента blocks_per_client блокировок с интервалом в сутки;
+    последняя блокировка каждого второго клиента активна. Номера изменений выделяются
+    в транзакции каждого пакета: одна транзакция PostgreSQL получает не больше
+    ChangeSequence.PER_TRANSACTION номеров.
+    """
+    reasons = list(BlockReason)
+    now = datetime.utcnow()
+    for start in range(0, clients, SEED_CHUNK_SIZE):
+        indexes = range(start, min(start + SEED_CHUNK_SIZE, clients))
+        seq = iter(ChangeSequence.allocate(len(indexes) * blocks_per_client))
+        client_ids = db.session.scalars(
+            insert(Client).returning(Client.id, sort_by_parameter_order=True),
+            [{
+                "client_identifier": client_identifier(index),
+                "name": f"ООО «Клиент {index}»",
+                "created_at": now,
+                "updated_at": now,
+            } for index in indexes]
+        ).all()
+        blocks = []
+        for index, client_id in zip(indexes, client_ids):
+            for number in range(blocks_per_client):
+                active = index % 2 == 0 and number == blocks_per_client - 1
+                blocked_at = now - timedelta(days=blocks_per_client - number)
+                blocks.append({
+                    "client_id": client_id,
+                    "reason": reasons[(index + number) % len(reasons)],
+                    "details": None,
+                    "is_active": active,
+                    "blocked_at": blocked_at,
+                    "blocked_by": "benchmark",
+                    "unblocked_at": None if active else blocked_at + timedelta(hours=1),
+                    "unblocked_by": None if active else "benchmark",
+                    "change_seq": next(seq),
+                })
+        if blocks:
+            db.session.execute(insert(PaymentBlock), blocks)
+        db.session.commit()
+
+
+def middle_cursor():
+    """
+    Курсор на середину списка GET /blocks (требуется контекст приложения)
+
+    Страница по этому курсору читается по индексу (blocked_at, id) с середины таблицы,
+    а не с первой страницы.
+    """
+    row = db.session.query(PaymentBlock.blocked_at, PaymentBlock.id).order_by(
+        PaymentBlock.blocked_at.desc(), PaymentBlock.id.desc()
+    ).offset(PaymentBlock.query.count() // 2).first()
+    return encode_cursor(row.blocked_at, row.id)
+
+
+class Scenario:
+    """Генератор запросов к эндпоинтам; общие очереди связывают блокировку и разблокировку"""
+
+    def __init__(self, clients, run_id, cursor):
+        self.clients = clients
+        self.run_id = run_id
+        self.cursor = cursor
+        self._fresh = itertools.count()
+        self._blocked = queue.SimpleQueue()
+        self._blocked_batches = queue.SimpleQueue()
+
+    def endpoints(self):
+        """Пары (название, функция без аргументов, возвращающая (метод, путь, тело))"""
+        return [
+            ("GET /health", lambda: ("GET", "/api/v1/health", None)),
+            ("GET /clients/{id}/status", lambda: ("GET", f"/api/v1/clients/{self._existing()}/status", None)),
+            ("POST /clients/status:batch", lambda: ("POST", "/api/v1/clients/status:batch", {
+                "client_identifiers": [self._existing() for _ in range(BATCH_SIZE * 5)]
+            })),
+            ("GET /clients/{id}/history", lambda: ("GET", f"/api/v1/clients/{self._existing()}/history", None)),
+            ("GET /clients/{id}/history ndjson",
+             lambda: ("GET", f"/api/v1/clients/{self._existing()}/history?format=ndjson", None)),
+            ("GET /blocks", lambda: ("GET", "/api/v1/blocks", None)),
+            ("GET /blocks active", lambda: ("GET", "/api/v1/blocks?active=true&limit=100", None)),
+            ("GET /blocks cursor", lambda: ("GET", f"/api/v1/blocks?cursor={self.cursor}&total=none&limit=100", None)),
+            ("GET /changes", lambda: ("GET", f"/api/v1/changes?after={random.randrange(self.clients)}", None)),
+            ("GET /clients", lambda: ("GET", "/api/v1/clients?limit=100", None)),
+            ("GET /clients blocked", lambda: ("GET", "/api/v1/clients?blocked=true&total=none", None)),
+            ("GET /stats", lambda: ("GET", "/api/v1/stats", None)),
+            ("GET /events poll", lambda: ("GET", "/api/v1/events?mode=poll&timeout=0&after=0", None)),
+            ("POST /clients/{id}/block", self._block),
+            ("POST /clients/{id}/unblock", self._unblock),
+            ("POST /clients/block:batch", self._block_batch),
+            ("POST /clients/unblock:batch", self._unblock_batch),
+            ("GET /metrics", lambda: ("GET", "/api/v1/metrics", None)),
+            ("GET /metrics/cache", lambda: ("GET", "/api/v1/metrics/cache", None)),
+            ("GET /metrics/pool", lambda: ("GET", "/api/v1/metrics/pool", None)),
+        ]
+
+    def _existing(self):
+        return client_identifier(random.randrange(self.clients))
+
+    def _new_identifier(self):
+        return f"b{self.run_id}-{next(self._fresh)}"
+
+    def _block(self):
+        identifier = self._new_identifier()
+        self._blocked.put(identifier)
+        return "POST", f"/api/v1/clients/{identifier}/block", {
+            "reason": "fraud_suspicion", "blocked_by": "benchmark"
+        }
+
+    def _unblock(self):
+        identifier = self._blocked.get_nowait()
+        return "POST", f"/api/v1/clients/{identifier}/unblock", {"unblocked_by": "benchmark"}
+
+    def _block_batch(self):
+        identifiers = [self._new_identifier() for _ in range(BATCH_SIZE)]
+        self._blocked_batches.put(identifiers)
+        return "POST", "/api/v1/clients/block:batch", {"items": [
+            {"client_identifier": identifier, "reason": "other", "blocked_by": "benchmark"}
+            for identifier in identifiers
+        ]}
+
+    def _unblock_batch(self):
+        identifiers = self._blocked_batches.get_nowait()
+        return "POST", "/api/v1/clients/unblock:batch", {"items": [
+            {"client_identifier": identifier, "unblocked_by": "benchmark"} for identifier in identifiers
+        ]}
+
+
+class TestClientTransport:
+    """Запросы через тестовый клиент Flask; у каждого потока свой клиент"""
+
+    name = "flask-test-client"
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.close()
+        return response.status_code
+
+
+class HttpTransport:
+    """Запросы по HTTP к запущенному серверу"""
+
+    name = "http"
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, method, path, body):
+        data = None if body is None else json.dumps(body).encode()
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+
+def percentile(sorted_values, fraction):
+    """Процентиль по методу ближайшего ранга"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def measure(transport, make_request, requests, workers, warmup):
+    """Нагружает один эндпоинт и возвращает сводку задержек"""
+    def call():
+        method, path, body = make_request()
+        started = time.perf_counter()
+        status = transport.send(method, path, body)
+        return time.perf_counter() - started, status
+
+    for _ in range(warmup):
+        call()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(lambda _: call(), range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, status in results if status >= 400),
+        "rps": round(requests / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def run(args):
+    database_url = args.database_url
+    if database_url is None:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pbm-bench-"), "bench.db")
+    app = create_app("production", {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options(database_url),
+        "LOG_LEVEL": "WARNING",
+        "SNAPSHOT_PATH": None,
+        "SNAPSHOT_INTERVAL": None,
+    })
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        create_schema()
+        if Client.query.limit(1).count():
+            sys.exit("Database is not empty; pass --reset to drop and reseed it")
+        started = time.perf_counter()
+        seed(args.clients, args.blocks_per_client)
+        seed_seconds = time.perf_counter() - started
+        cursor = middle_cursor()
+        dialect = db.engine.dialect.name
+
+    transport = HttpTransport(args.base_url) if args.base_url else TestClientTransport(app)
+    scenario = Scenario(args.clients, run_id=int(time.time()), cursor=cursor)
+    endpoints = scenario.endpoints()
+    if args.only:
+        endpoints = [(name, make) for name, make in endpoints if any(part in name for part in args.only)]
+
+    results = {}
+    for name, make_request in endpoints:
+        results[name] = measure(transport, make_request, args.requests, args.workers, args.warmup)
+        print(f"{name:<36}{results[name]['rps']:>9.1f} rps  p95 {results[name]['p95_ms']:>8.2f} ms",
+              file=sys.stderr)
+
+    report = {
+        "meta": {
+            "clients": args.clients,
+            "blocks_per_client": args.blocks_per_client,
+            "workers": args.workers,
+            "requests": args.requests,
+            "transport": transport.name,
+            "dialect": dialect,
+            "seed_seconds": round(seed_seconds, 2),
+            "python": platform.python_version(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "endpoints": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+# Параметры замера, при расхождении которых результаты несравнимы
+COMPARABLE_META = ("clients", "blocks_per_client", "workers", "requests", "transport", "dialect")
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline_report = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current_report = json.load(file)
+
+    mismatched = [
+        key for key in COMPARABLE_META
+        if baseline_report["meta"].get(key) != current_report["meta"].get(key)
+    ]
+    if mismatched:
+        for key in mismatched:
+            print(f"meta {key}: baseline {baseline_report['meta'].get(key)!r}, "
+                  f"current {current_report['meta'].get(key)!r}", file=sys.stderr)
+        sys.exit("Results were measured with different parameters and cannot be compared")
+
+    baseline, current = baseline_report["endpoints"], current_report["endpoints"]
+    regressions = 0
+    print(f"{'endpoint':<36}{'p95 base':>10}{'p95 now':>10}{'rps base':>10}{'rps now':>10}")
+    for name in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[name], current[name]
+        slower = new["p95_ms"] > old["p95_ms"] * (1 + args.threshold)
+        fewer = new["rps"] < old["rps"] * (1 - args.threshold)
+        failed = new["errors"] > old["errors"]
+        verdict = "REGRESSION" if slower or fewer or failed else ""
+        regressions += bool(verdict)
+        print(f"{name:<36}{old['p95_ms']:>10.2f}{new['p95_ms']:>10.2f}"
+              f"{old['rps']:>10.1f}{new['rps']:>10.1f}  {verdict}")
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"{name:<36}missing from current results")
+    # Эндпоинт без базового замера не защищен от регрессий: базовый отчет нужно обновить
+    unmeasured = sorted(current.keys() - baseline.keys())
+    for name in unmeasured:
+        print(f"{name:<36}MISSING FROM BASELINE")
+
+    sys.exit(1 if regressions or unmeasured else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Заполнить базу и нагрузить эндпоинты")
+    run_parser.add_argument("--clients", type=int, default=2000, help="Число клиентов")
+    run_parser.add_argument("--blocks-per-client", type=int, default=5, help="Блокировок на клиента")
+    run_parser.add_argument("--workers", type=int, default=8, help="Параллельных воркеров")
+    run_parser.add_argument("--requests", type=int, default=200, help="Запросов на эндпоинт")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Прогревочных запросов на эндпоинт")
+    run_parser.add_argument("--database-url", help="База для заполнения (по умолчанию временный файл SQLite)")
+    run_parser.add_argument("--reset", action="store_true", help="Удалить таблицы перед заполнением")
+    run_parser.add_argument("--base-url", help="Адрес запущенного сервера, например http://127.0.0.1:5000")
+    run_parser.add_argument("--only", nargs="+", help="Нагружать только эндпоинты, содержащие подстроку")
+    run_parser.add_argument("--output", help="Файл для JSON-отчета (по умолчанию stdout)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Сравнить результат с базовым")
+    compare_parser.add_argument("baseline", help="JSON-отчет базового замера")
+    compare_parser.add_argument("current", help="JSON-отчет текущего замера")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="Допустимое ухудшение p95 и rps (доля)")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Проверка числа SQL-запросов эндпоинтов чтения при росте объема данных
+
+Для каждого объема N в базе SQLite в памяти создается N клиентов с активной
+блокировкой, у первого клиента — N блокировок в истории. Число SQL-запросов
+каждого эндпоинта должно оставаться постоянным; иначе команда завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.queries [--sizes 1 10 50]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from models import BlockReason, ChangeSequence, Client, PaymentBlock  # noqa: E402
+from testing import query_counts  # noqa: E402
+
+FIRST_CLIENT = "7700000000"
+
+# Проверяемые запросы: (название, send(client))
+CASES = [
+    ("status", lambda client: client.get(f"/api/v1/clients/{FIRST_CLIENT}/status")),
+    ("status:batch", lambda client: client.post(
+        "/api/v1/clients/status:batch",
+        json={"client_identifiers": [FIRST_CLIENT, "0000000000"]}
+    )),
+    ("history", lambda client: client.get(f"/api/v1/clients/{FIRST_CLIENT}/history")),
+    ("blocks", lambda client: client.get("/api/v1/blocks")),
+    ("blocks, cursor", lambda client: client.get("/api/v1/blocks?cursor=&total=none")),
+    ("changes", lambda client: client.get("/api/v1/changes?after=0")),
+    ("stats", lambda client: client.get("/api/v1/stats")),
+    ("clients", lambda client: client.get("/api/v1/clients")),
+    ("clients, blocked", lambda client: client.get("/api/v1/clients?blocked=true")),
+    ("clients, search", lambda client: client.get("/api/v1/clients?q=клиент")),
+]
+
+
+def seed(size):
+    """Доводит данные до size клиентов и size блокировок в истории первого клиента"""
+    existing = Client.query.count()
+    for index in range(existing, size):
+        client = Client(client_identifier=f"77{index:08d}", name=f"ООО Клиент {index}")
+        db.session.add(client)
+        db.session.flush()
+        db.session.add(PaymentBlock(
+            client_id=client.id, reason=BlockReason.OTHER, blocked_by="benchmark",
+            change_seq=ChangeSequence.allocate()[0]
+        ))
+
+    first = Client.query.filter_by(client_identifier=FIRST_CLIENT).one()
+    history = PaymentBlock.query.filter_by(client_id=first.id).count()
+    for _ in range(history, size):
+        # Новая активная блокировка заменяет прежнюю, прежняя уходит в историю
+        first.active_block.unblock("benchmark")
+        db.session.flush()
+        db.session.add(PaymentBlock(
+            client_id=first.id, reason=BlockReason.FRAUD_SUSPICION, blocked_by="benchmark",
+            change_seq=ChangeSequence.allocate()[0]
+        ))
+        db.session.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="Объемы данных")
+    args = parser.parse_args()
+
+    failed = False
+    for name, send in CASES:
+        app = create_app("test", {"STATUS_CACHE_MAX_SIZE": 0})
+        counts = query_counts(app, seed, send, args.sizes)
+        constant = len({count for _, count in counts}) == 1
+        failed = failed or not constant
+        details = "  ".join(f"{size}: {count}" for size, count in counts)
+        print(f"{name:<18}{details}  {'ok' if constant else 'GROWS'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Замер поиска клиентов по подстроке наименования и идентификатора
+
+Заполняет базу SQLite или PostgreSQL заданным числом клиентов (по умолчанию 1 000 000)
+с наименованиями на кириллице и латинице, затем для каждой строки поиска измеряет медиану
+времени получения первой страницы и числа совпадений: через search_clients (триграммный
+индекс) и через ILIKE '%...%' без индекса. Результат выводится в JSON.
+
+Запуск из корня репозитория:
+    python -m benchmarks.search [--clients 1000000] [--runs 5] [--database-url URL]
+                                [--reset] [--output results.json] [--term ромаш ...]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, or_  # noqa: E402
+
+from app import create_app, create_schema, db  # noqa: E402
+from config import engine_options  # noqa: E402
+from models import Client  # noqa: E402
+from search import search_clients  # noqa: E402
+
+# Размер пакета строк при заполнении базы
+SEED_CHUNK_SIZE = 10000
+
+# Размер страницы результатов
+PAGE_SIZE = 50
+
+FORMS = ("ООО", "АО", "ПАО", "ИП", "LLC", "ЗАО")
+WORDS = (
+    "Ромашка", "Василёк", "Северный", "Ветер", "Трейд", "Логистика", "Альфа", "Омега",
+    "Строй", "Инвест", "Капитал", "Маркет", "Сибирь", "Волга", "Урал", "Технологии",
+    "Agro", "Nord", "Systems", "Group",
+)
+SURNAMES = ("Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнова", "Попова", "Лебедев", "Соколова")
+
+# Строки поиска: частая и редкая подстроки наименования, другой регистр, префикс и точный
+# идентификатор, латиница и короткая строка без индекса
+DEFAULT_TERMS = ("ромаш", "ВАСИЛЁК ИНВЕСТ", "Петров", "770012", "7700123456", "nord sys", "Ив")
+
+
+def client_identifier(index):
+    return f"77{index:08d}"
+
+
+def client_name(index):
+    form = FORMS[index % len(FORMS)]
+    if form == "ИП":
+        return f"ИП {SURNAMES[index // len(FORMS) % len(SURNAMES)]} {index}"
+    first = WORDS[index // len(FORMS) % len(WORDS)]
+    second = WORDS[index // (len(FORMS) * len(WORDS)) % len(WORDS)]
+    return f"{form} «{first} {second} {index % 997}»"
+
+
+def seed(clients):
+    """Заполняет пустую базу клиентами (требуется контекст приложения)"""
+    now = datetime.utcnow()
+    for start in range(0, clients, SEED_CHUNK_SIZE):
+        db.session.execute(insert(Client), [{
+            "client_identifier": client_identifier(index),
+            "name": client_name(index),
+            "created_at": now,
+            "updated_at": now,
+        } for index in range(start, min(start + SEED_CHUNK_SIZE, clients))])
+        db.session.commit()
+
+
+def indexed(term):
+    return search_clients(db.session.query(Client.id), term)[0]
+
+
+def indexed_page(term):
+    query, order_by = search_clients(db.session.query(Client.id), term)
+    return query.order_by(*order_by).limit(PAGE_SIZE)
+
+
+def scan(term):
+    return db.session.query(Client.id).filter(or_(
+        Client.name.ilike(f"%{term}%"),
+        Client.client_identifier.ilike(f"%{term}%")
+    ))
+
+
+def scan_page(term):
+    return scan(term).order_by(Client.id).limit(PAGE_SIZE)
+
+
+def measure(make_query, make_page, term, runs):
+    """Медиана времени страницы и подсчета совпадений в миллисекундах"""
+    timings = []
+    matches = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        make_page(term).all()
+        matches = make_query(term).count()
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    return {"median_ms": round(statistics.median(timings), 2), "matches": matches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000000, help="Число клиентов")
+    parser.add_argument("--runs", type=int, default=5, help="Число замеров каждой строки поиска")
+    parser.add_argument("--database-url", help="База данных (по умолчанию временный файл SQLite)")
+    parser.add_argument("--reset", action="store_true", help="Удалить таблицы и заполнить базу заново")
+    parser.add_argument("--term", action="append", help="Строка поиска (можно указать несколько раз)")
+    parser.add_argument("--output", help="Файл для результата в JSON")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pbm-search-"), "search.db")
+    app = create_app("production", {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options(database_url),
+        "LOG_LEVEL": "WARNING",
+        "SNAPSHOT_PATH": None,
+        "SNAPSHOT_INTERVAL": None,
+    })
+
+    results = {}
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        create_schema()
+        if Client.query.limit(1).count():
+            sys.exit("Database is not empty; pass --reset to drop and reseed it")
+        started = time.perf_counter()
+        seed(args.clients)
+        seed_seconds = time.perf_counter() - started
+        dialect = db.engine.dialect.name
+
+        for term in args.term or DEFAULT_TERMS:
+            results[term] = {
+                "indexed": measure(indexed, indexed_page, term, args.runs),
+                "scan": measure(scan, scan_page, term, args.runs),
+            }
+            print(f"{term:<20}{results[term]['indexed']['median_ms']:>10.2f} ms  "
+                  f"scan {results[term]['scan']['median_ms']:>10.2f} ms  "
+                  f"matches {results[term]['indexed']['matches']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "clients": args.clients,
+            "runs": args.runs,
+            "page_size": PAGE_SIZE,
+            "dialect": dialect,
+            "seed_seconds": round(seed_seconds, 2),
+            "python": platform.python_version(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "terms": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
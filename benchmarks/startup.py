@@ -0,0 +1,74 @@
+"""
+Замер времени запуска приложения с проверкой бюджета
+
+Каждый замер выполняется в отдельном процессе интерпретатора: отдельно измеряются
+импорт зависимостей (Flask, Flask-SQLAlchemy), собственный импорт модуля app и вызов
+create_app("test"). Если медиана превышает бюджет, команда завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.startup [--runs 5] [--import-budget-ms 50] [--create-budget-ms 750]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Код одного замера: результаты в миллисекундах выводятся последней строкой в JSON
+PROBE = """
+import json, time
+started = time.perf_counter()
+import flask, flask_sqlalchemy
+dependencies = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app("test")
+created = time.perf_counter()
+print(json.dumps({
+    "dependencies_ms": (dependencies - started) * 1000,
+    "import_ms": (imported - dependencies) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+}))
+"""
+
+
+def measure():
+    """Один замер в новом процессе"""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Число замеров")
+    parser.add_argument("--import-budget-ms", type=float, default=50,
+                        help="Бюджет собственного импорта модуля app (без зависимостей)")
+    parser.add_argument("--create-budget-ms", type=float, default=750,
+                        help="Бюджет create_app('test'), включая импорт блюпринтов и создание схемы")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    budgets = {"import_ms": args.import_budget_ms, "create_app_ms": args.create_budget_ms}
+
+    failed = False
+    for key, value in medians.items():
+        budget = budgets.get(key)
+        verdict = ""
+        if budget is not None:
+            verdict = "ok" if value <= budget else "OVER BUDGET"
+            failed = failed or value > budget
+            verdict = f"(budget {budget:.0f} ms: {verdict})"
+        print(f"{key:<18}{value:>10.1f} ms {verdict}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
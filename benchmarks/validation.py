@@ -0,0 +1,73 @@
+"""
+Сравнение скорости проверки тел запросов: marshmallow Schema.load и CompiledSchema.load
+
+Запуск из корня репозитория:
+    python -m benchmarks.validation [--number 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marshmallow import ValidationError  # noqa: E402
+
+from schemas import BlockPaymentSchema, UnblockPaymentSchema  # noqa: E402
+from validators import CompiledSchema  # noqa: E402
+
+CASES = [
+    ("block, valid", BlockPaymentSchema, {
+        "client_identifier": "7701234567",
+        "reason": "fraud_suspicion",
+        "details": "Подозрительная активность",
+        "blocked_by": "Иванов И.И.",
+    }),
+    ("block, invalid reason", BlockPaymentSchema, {
+        "client_identifier": "7701234567",
+        "reason": "unknown",
+        "blocked_by": "Иванов И.И.",
+    }),
+    ("block, missing fields", BlockPaymentSchema, {
+        "client_identifier": "",
+        "extra": 1,
+    }),
+    ("unblock, valid", UnblockPaymentSchema, {
+        "client_identifier": "7701234567",
+        "unblocked_by": "Петров П.П.",
+        "reason": "Проверка пройдена",
+    }),
+    ("unblock, invalid", UnblockPaymentSchema, {
+        "client_identifier": "x" * 51,
+        "unblocked_by": None,
+    }),
+]
+
+
+def _loader(load, data):
+    def run():
+        try:
+            load(data)
+        except ValidationError:
+            pass
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Число проверок в каждом замере")
+    parser.add_argument("--repeat", type=int, default=5, help="Число замеров (берется лучший)")
+    args = parser.parse_args()
+
+    print(f"{'case':<24}{'marshmallow, us':>18}{'compiled, us':>15}{'speedup':>10}")
+    for name, schema_class, data in CASES:
+        schema, compiled = schema_class(), CompiledSchema(schema_class)
+        timings = []
+        for load in (schema.load, compiled.load):
+            best = min(timeit.repeat(_loader(load, data), number=args.number, repeat=args.repeat))
+            timings.append(best / args.number * 1e6)
+        print(f"{name:<24}{timings[0]:>18.2f}{timings[1]:>15.2f}{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
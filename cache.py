@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру кэш в памяти процесса с вытеснением LRU и временем жизни записей.
+
+    Кэш потокобезопасен и ведет счетчики попаданий, промахов и вытеснений.
+    Каждый воркер gunicorn держит собственный экземпляр, поэтому инвалидация
+    действует только в пределах процесса; устаревание между воркерами
+    ограничено временем жизни записи.
+    """
+
+    def __init__(self, max_size=10000, ttl=5.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._generation = 0
+
+    def get(self, key):
+        """Возвращает значение по ключу или None, если записи нет или она устарела"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version(self):
+        """
+        Возвращает номер поколения кэша, который увеличивается при каждой инвалидации.
+
+        Значение берется перед чтением из БД и передается в set(), чтобы не
+        сохранить в кэш данные, прочитанные до параллельной инвалидации.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, ttl=None, version=None):
+        """
+        Сохраняет значение в кэше
+
+        Аргументы:
+            key: Ключ записи
+            value: Сохраняемое значение
+            ttl (float, optional): Время жизни записи в секундах вместо значения по умолчанию
+            version (int, optional): Поколение, полученное из version() до чтения данных;
+                                     если с тех пор была инвалидация, запись не сохраняется
+        """
+        if self.max_size <= 0:
+            return
+
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if version is not None and version != self._generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Удаляет запись по ключу, если она есть"""
+        with self._lock:
+            self._generation += 1
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Полностью очищает кэш"""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def configure(self, max_size=None, ttl=None):
+        """Изменяет параметры кэша (используется при инициализации приложения)"""
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._data) > max(self.max_size, 0):
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Возвращает счетчики кэша"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Кэш сериализованных ответов о статусе блокировки, ключ — client_identifier
+status_cache = TTLCache()
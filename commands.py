@@ -0,0 +1,258 @@
+import csv
+import enum
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from itertools import islice
+
+import click
+from flask import Blueprint
+from marshmallow import ValidationError
+from sqlalchemy import insert
+
+from app import db, create_schema
+from models import PaymentBlock, ImportCheckpoint, ChangeSequence, StatCounter
+from schemas import ImportBlockSchema
+from utils import get_or_create_clients, touch_clients
+from snapshot_export import snapshot_exporter
+from search import ensure_search_index
+from expiry import expiry_sweeper
+
+logger = logging.getLogger(__name__)
+
+# Команды регистрируются через blueprint, чтобы быть доступными как `flask <команда>`
+commands_bp = Blueprint('commands', __name__, cli_group=None)
+
+import_block_schema = ImportBlockSchema()
+
+# Столбцы payment_blocks, загружаемые импортом
+IMPORT_COLUMNS = (
+    'client_id', 'reason', 'details', 'is_active', 'blocked_at', 'unblocked_at',
+    'expires_at', 'blocked_by', 'unblocked_by', 'unblock_reason', 'change_seq'
+)
+
+
+@commands_bp.cli.command('init-db')
+def init_db_command():
+    """Создание недостающих таблиц и индексов (шаг миграции схемы при развертывании)"""
+    create_schema()
+    click.echo("Схема базы данных создана")
+
+
+@commands_bp.cli.command('rebuild-stat-counters')
+def rebuild_stat_counters_command():
+    """Пересчет таблицы stat_counters (перед включением STAT_COUNTERS или после ручных правок данных)"""
+    values = StatCounter.rebuild()
+    db.session.commit()
+    for name, value in values.items():
+        click.echo(f"{name:<32}{value:>12}")
+
+
+@commands_bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Создание индекса поиска клиентов в существующей базе и его переиндексация"""
+    dialect = ensure_search_index()
+    click.echo(f"Индекс поиска клиентов готов ({dialect})")
+
+
+@commands_bp.cli.command('expire-blocks')
+def expire_blocks_command():
+    """Однократное снятие блокировок с истекшим сроком действия (например, из cron)"""
+    count = expiry_sweeper.sweep()
+    click.echo(f"Снято истекших блокировок: {count}")
+
+
+@commands_bp.cli.command('import-blocks')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+              help='Формат файла (по умолчанию определяется по расширению)')
+@click.option('--chunk-size', default=5000, show_default=True, help='Число строк в одной транзакции')
+@click.option('--job', help='Имя задания для возобновления (по умолчанию — имя файла)')
+@click.option('--restart', is_flag=True, help='Игнорировать сохраненный прогресс и начать сначала')
+def import_blocks_command(path, file_format, chunk_size, job, restart):
+    """Импорт исторических блокировок из файла CSV или NDJSON"""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    job = job or os.path.basename(path)
+
+    checkpoint = db.session.get(ImportCheckpoint, job)
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(source=job, rows_committed=0)
+        db.session.add(checkpoint)
+        db.session.commit()
+    elif restart:
+        checkpoint.rows_committed = 0
+        db.session.commit()
+
+    skip = checkpoint.rows_committed
+    if skip:
+        click.echo(f"Возобновление задания {job} со строки {skip + 1}")
+
+    started = time.perf_counter()
+    loaded = rejected = 0
+
+    with open(path, newline='', encoding='utf-8') as source:
+        records = islice(_read_records(source, file_format), skip, None)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            chunk_loaded, errors = import_chunk(chunk)
+            checkpoint.rows_committed += len(chunk)
+            db.session.commit()
+
+            loaded += chunk_loaded
+            rejected += len(errors)
+            for line_number, message in errors:
+                logger.warning(f"Строка {skip + line_number + 1} отклонена: {message}")
+
+            elapsed = time.perf_counter() - started
+            click.echo(
+                f"{checkpoint.rows_committed} строк обработано, {loaded} загружено, "
+                f"{rejected} отклонено, {loaded / elapsed:.0f} строк/с"
+            )
+            skip += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"Импорт завершен за {elapsed:.1f} с: {loaded} загружено, {rejected} отклонено")
+
+
+def import_chunk(records):
+    """
+    Загрузка порции строк импорта в текущей транзакции
+
+    Строки проверяются правилами BlockPaymentSchema, клиенты создаются пакетной
+    вставкой, блокировки загружаются через COPY (PostgreSQL) или executemany.
+    Активные блокировки для клиентов, у которых уже есть активная блокировка,
+    отклоняются до загрузки, чтобы не нарушить индекс uq_payment_blocks_active_client.
+
+    Аргументы:
+        records (list): Словари строк источника
+
+    Возвращает:
+        tuple: (loaded, errors)
+            loaded (int): Число загруженных блокировок
+            errors (list): Пары (номер строки в порции, сообщение) для отклоненных строк
+    """
+    rows = []
+    errors = []
+    for index, record in enumerate(records):
+        try:
+            rows.append((index, import_block_schema.load(_clean_record(record))))
+        except ValidationError as err:
+            errors.append((index, str(err.messages)))
+
+    names = {row['client_identifier']: row.get('client_name') for _, row in rows if row.get('client_name')}
+    client_ids = get_or_create_clients((row['client_identifier'] for _, row in rows), names)
+
+    # Клиенты, у которых уже есть активная блокировка, в том числе в этой порции
+    active_clients = set(
+        client_id for (client_id,) in db.session.query(PaymentBlock.client_id).filter(
+            PaymentBlock.client_id.in_(set(client_ids.values())),
+            PaymentBlock.active_predicate()
+        )
+    )
+
+    blocks = []
+    for index, row in rows:
+        client_id = client_ids[row['client_identifier']]
+        is_active = row.get('is_active', row.get('unblocked_at') is None)
+        if is_active:
+            if client_id in active_clients:
+                errors.append((index, "client already has an active payment block"))
+                continue
+            active_clients.add(client_id)
+
+        blocks.append({
+            'client_id': client_id,
+            'reason': row['reason'],
+            'details': row.get('details'),
+            'is_active': is_active,
+            'blocked_at': row.get('blocked_at') or datetime.utcnow(),
+            'unblocked_at': row.get('unblocked_at'),
+            'expires_at': row.get('expires_at'),
+            'blocked_by': row['blocked_by'],
+            'unblocked_by': row.get('unblocked_by'),
+            'unblock_reason': row.get('unblock_reason'),
+        })
+
+    if blocks:
+        for block, change_seq in zip(blocks, ChangeSequence.allocate(len(blocks))):
+            block['change_seq'] = change_seq
+        if db.engine.dialect.name == 'postgresql':
+            _copy_blocks(blocks)
+        else:
+            db.session.execute(insert(PaymentBlock.__table__), blocks)
+        touch_clients(block['client_id'] for block in blocks)
+        StatCounter.record_created((block['reason'], block['is_active'], block['blocked_at']) for block in blocks)
+
+    return len(blocks), sorted(errors)
+
+
+def _read_records(source, file_format):
+    """Потоковое чтение записей из файла CSV или NDJSON"""
+    if file_format == 'csv':
+        yield from csv.DictReader(source)
+        return
+
+    for line in source:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as err:
+                # Некорректная строка отклоняется при проверке, а не прерывает импорт
+                yield {'__error__': str(err)}
+
+
+def _clean_record(record):
+    """Удаление пустых значений CSV, чтобы необязательные поля считались отсутствующими"""
+    if '__error__' in record:
+        raise ValidationError(record['__error__'])
+    return {key: value for key, value in record.items() if value not in ('', None)}
+
+
+def _copy_blocks(blocks):
+    """Загрузка блокировок командой COPY в соединении текущей транзакции"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for block in blocks:
+        writer.writerow([
+            r'\N' if value is None else _copy_value(value)
+            for value in (block[column] for column in IMPORT_COLUMNS)
+        ])
+    buffer.seek(0)
+
+    connection = db.session.connection().connection.driver_connection
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY payment_blocks ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+
+def _copy_value(value):
+    """Представление значения для COPY: перечисления хранятся по имени, как в SQLAlchemy Enum"""
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+@commands_bp.cli.command('export-snapshot')
+@click.option('--path', help='Путь к файлу снимка (по умолчанию SNAPSHOT_PATH)')
+def export_snapshot_command(path):
+    """Формирование снимка активных блокировок для платежного шлюза"""
+    path = path or snapshot_exporter.path
+    if not path:
+        raise click.UsageError("Укажите --path или задайте переменную окружения SNAPSHOT_PATH")
+
+    started = time.perf_counter()
+    count = snapshot_exporter.export(path)
+    click.echo(f"Снимок {path}: {count} активных блокировок за {time.perf_counter() - started:.2f} с")
@@ -0,0 +1,131 @@
+import os
+
+from sqlalchemy.engine import make_url
+
+from metrics import InstrumentedQueuePool
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def _env_float(name, default=None):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def engine_options(database_url):
+    """
+    Engine options for the database URL
+
+    Pool sizing is read from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE and DB_POOL_PRE_PING. Pooled databases get InstrumentedQueuePool,
+    which reports checkout wait times; in-memory SQLite keeps its single shared connection.
+    """
+    options = {
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 300)),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+    if not database_url:
+        return options
+
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    options["poolclass"] = InstrumentedQueuePool
+    for option, variable, cast in (
+        ("pool_size", "DB_POOL_SIZE", int),
+        ("max_overflow", "DB_MAX_OVERFLOW", int),
+        ("pool_timeout", "DB_POOL_TIMEOUT", float),
+    ):
+        if os.environ.get(variable):
+            options[option] = cast(os.environ[variable])
+    return options
+
+
+class Config:
+    """Base configuration read from environment variables"""
+    SECRET_KEY = os.environ.get("SESSION_SECRET")
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+
+    # Create missing tables on startup; otherwise run `flask init-db` explicitly
+    AUTO_CREATE_SCHEMA = False
+
+    # Database connection
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Read replicas for read-only endpoints (comma-separated URLs), checked every
+    # REPLICA_HEALTH_INTERVAL seconds; PostgreSQL replicas lagging more than REPLICA_MAX_LAG are skipped
+    SQLALCHEMY_REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    REPLICA_HEALTH_INTERVAL = _env_float("REPLICA_HEALTH_INTERVAL", 5.0)
+    REPLICA_MAX_LAG = _env_float("REPLICA_MAX_LAG")
+
+    # In-process client status cache
+    STATUS_CACHE_MAX_SIZE = int(os.environ.get("STATUS_CACHE_MAX_SIZE", 10000))
+    STATUS_CACHE_TTL = float(os.environ.get("STATUS_CACHE_TTL", 5))
+
+    # Memory-mapped snapshot of active blocks (disabled without a path)
+    SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH")
+    SNAPSHOT_INTERVAL = _env_float("SNAPSHOT_INTERVAL")
+    SNAPSHOT_DEBOUNCE = _env_float("SNAPSHOT_DEBOUNCE", 1.0)
+
+    # Background removal of expired blocks (seconds between sweeps; 0 disables the sweeper thread)
+    EXPIRY_SWEEP_INTERVAL = _env_float("EXPIRY_SWEEP_INTERVAL", 30.0)
+    EXPIRY_BATCH_SIZE = int(os.environ.get("EXPIRY_BATCH_SIZE", 1000))
+    EXPIRY_LEASE_TTL = _env_float("EXPIRY_LEASE_TTL", 60.0)
+
+    # Per-endpoint latency, DB and serialization time metrics (GET /api/v1/metrics)
+    REQUEST_METRICS = _env_bool("REQUEST_METRICS", True)
+
+    # SQL statements allowed per request before a warning is logged (debug or QUERY_BUDGET_WARNINGS)
+    QUERY_BUDGET = int(os.environ.get("QUERY_BUDGET", 10))
+    QUERY_BUDGET_WARNINGS = _env_bool("QUERY_BUDGET_WARNINGS", False)
+
+    # Keep block statistics in the stat_counters table (run `flask rebuild-stat-counters` before enabling)
+    STAT_COUNTERS = _env_bool("STAT_COUNTERS", False)
+
+    # Serialize hot responses without marshmallow (set FAST_SERIALIZER=false to fall back)
+    FAST_SERIALIZER = _env_bool("FAST_SERIALIZER", True)
+
+    # Block event stream (one database poller per process)
+    EVENTS_POLL_INTERVAL = _env_float("EVENTS_POLL_INTERVAL", 0.5)
+    EVENTS_BUFFER_SIZE = int(os.environ.get("EVENTS_BUFFER_SIZE", 10000))
+    EVENTS_HEARTBEAT = _env_float("EVENTS_HEARTBEAT", 15.0)
+
+
+class ProductionConfig(Config):
+    """Production: the schema is migrated by a separate `flask init-db` step"""
+
+
+class DevelopmentConfig(Config):
+    """Local development: verbose logging and tables created on startup"""
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG")
+    AUTO_CREATE_SCHEMA = True
+    QUERY_BUDGET_WARNINGS = True
+
+
+class TestConfig(Config):
+    """Tests: isolated in-memory SQLite database, no background exporters"""
+    TESTING = True
+    SECRET_KEY = "test"
+    LOG_LEVEL = "WARNING"
+    AUTO_CREATE_SCHEMA = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_REPLICA_URLS = []
+    SNAPSHOT_PATH = None
+    SNAPSHOT_INTERVAL = None
+    EXPIRY_SWEEP_INTERVAL = None
+    JWT_SECRET_KEY = "test"
+    QUERY_BUDGET_WARNINGS = True
+
+
+# Configuration profiles selectable by name (APP_CONFIG or create_app argument)
+PROFILES = {
+    "production": ProductionConfig,
+    "development": DevelopmentConfig,
+    "test": TestConfig,
+}
@@ -0,0 +1,223 @@
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from sqlalchemy import func, select
+
+from app import db
+from models import BlockEvent
+
+logger = logging.getLogger(__name__)
+
+# Событие в кольцевом буфере: кадр SSE и JSON для long-poll формируются один раз
+# при получении события из БД и затем отдаются всем подписчикам без копирования
+Event = namedtuple('Event', ['id', 'event_type', 'data', 'frame'])
+
+# Наибольшее число событий, отдаваемых подписчику за одно чтение
+READ_BATCH_SIZE = 500
+
+# Время (с), после которого удерживаемый пропуск в нумерации попадает в журнал предупреждением
+GAP_WARNING_SECONDS = 30
+
+
+class EventBroker:
+    """
+    Доставка событий блокировки подписчикам SSE и long-poll.
+
+    Один фоновый поток на процесс читает новые строки block_events и складывает их
+    в кольцевой буфер; подписчики ждут на общем условии и читают буфер, поэтому
+    нагрузка на БД не зависит от числа подписчиков. Подписчик, отставший дальше
+    начала буфера (или переподключившийся со старым Last-Event-ID), догоняет по БД.
+
+    Идентификаторы событий выдаются до фиксации транзакции, поэтому строка с меньшим
+    id может стать видимой позже строки с большим. Поток не выдает события за
+    пропуском в нумерации, пока пропуск не заполнится или не станет ясно, что он
+    не заполнится никогда (откат транзакции), — так id, видимые подписчику, монотонно
+    растут и возобновление по Last-Event-ID ничего не теряет. В PostgreSQL пропуск
+    считается окончательным, когда завершены все транзакции, начатые до его обнаружения
+    (txid_snapshot_xmin не меньше запомненного txid_snapshot_xmax): событие записывается
+    после изменения блокировки, поэтому транзакция, получившая пропущенный id, к этому
+    моменту уже имела номер. Сколько бы ни длилась такая транзакция, ее событие не теряется.
+    SQLite допускает одну пишущую транзакцию, и строка с большим id видна только после
+    завершения транзакции с меньшим, поэтому пропуск там сразу окончательный.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.poll_interval = 0.5
+        self.buffer_size = 10000
+        self.heartbeat = 15.0
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._started = threading.Event()
+        self._start_error = None
+        # Все события с id <= _floor уже выданы (или пропущены), события с id > _buffer_floor есть в буфере
+        self._floor = 0
+        self._buffer_floor = 0
+        self._gap = None
+
+    def init_app(self, app):
+        """Чтение настроек EVENTS_POLL_INTERVAL, EVENTS_BUFFER_SIZE и EVENTS_HEARTBEAT"""
+        self.app = app
+        self.poll_interval = app.config.get("EVENTS_POLL_INTERVAL", self.poll_interval)
+        self.buffer_size = app.config.get("EVENTS_BUFFER_SIZE", self.buffer_size)
+        self.heartbeat = app.config.get("EVENTS_HEARTBEAT", self.heartbeat)
+
+    @property
+    def last_event_id(self):
+        """Id последнего выданного события"""
+        self.start()
+        with self._condition:
+            return self._floor
+
+    def wake(self):
+        """Внеочередной опрос БД после фиксации изменения в этом процессе"""
+        if self._thread is not None:
+            self._wake.set()
+
+    def start(self):
+        """Запуск фонового потока при первом обращении подписчика"""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._started.clear()
+                self._start_error = None
+                self._thread = threading.Thread(target=self._run, name="event-broker", daemon=True)
+                self._thread.start()
+        self._started.wait()
+        # Поток завершился, не прочитав начальный id: ошибка передается подписчику,
+        # следующее обращение запустит поток заново
+        if self._start_error is not None:
+            raise self._start_error
+
+    def read(self, after, timeout):
+        """
+        Чтение событий с id больше after
+
+        Если таких событий еще нет, ожидает их не дольше timeout секунд.
+
+        Аргументы:
+            after (int): Id последнего полученного подписчиком события
+            timeout (float): Наибольшее время ожидания в секундах
+
+        Возвращает:
+            list: События Event в порядке возрастания id (пустой список по таймауту)
+        """
+        self.start()
+        with self._condition:
+            if after < self._buffer_floor:
+                upper = self._buffer_floor
+            else:
+                self._condition.wait_for(lambda: self._floor > after, timeout=timeout)
+                if after >= self._buffer_floor:
+                    return self._read_buffer(after)
+                upper = self._buffer_floor
+        return self._read_history(after, upper)
+
+    def _read_buffer(self, after):
+        events = []
+        for event in reversed(self._buffer):
+            if event.id <= after:
+                break
+            events.append(event)
+        events.reverse()
+        return events[:READ_BATCH_SIZE]
+
+    def _read_history(self, after, upper):
+        """Догоняющее чтение из БД для подписчика, отставшего дальше начала буфера"""
+        rows = db.session.query(BlockEvent).filter(
+            BlockEvent.id > after, BlockEvent.id <= upper
+        ).order_by(BlockEvent.id).limit(READ_BATCH_SIZE).all()
+        # Соединение не удерживается на время ожидания в потоке SSE
+        db.session.close()
+        return [_make_event(row) for row in rows]
+
+    def _run(self):
+        try:
+            with self.app.app_context():
+                last_id = db.session.query(db.func.max(BlockEvent.id)).scalar() or 0
+                db.session.remove()
+            with self._condition:
+                self._floor = self._buffer_floor = max(self._floor, last_id)
+        except Exception as err:
+            logger.error(f"Failed to start the event broker: {str(err)}")
+            self._start_error = err
+            return
+        finally:
+            self._started.set()
+
+        while True:
+            self._wake.wait(timeout=self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    while self._poll():
+                        pass
+            except Exception as err:
+                logger.error(f"Failed to poll block events: {str(err)}")
+
+    def _poll(self):
+        """Один опрос block_events; возвращает True, если есть еще непрочитанные строки"""
+        try:
+            rows = db.session.query(BlockEvent).filter(
+                BlockEvent.id > self._floor
+            ).order_by(BlockEvent.id).limit(READ_BATCH_SIZE).all()
+
+            expected = self._floor + 1
+            events = []
+            for row in rows:
+                if row.id != expected:
+                    # Пропуск в нумерации: ждем, пока он заполнится или станет окончательным
+                    if not self._gap_closed(expected):
+                        break
+                    logger.debug(f"Skipping block event ids {expected}..{row.id - 1}")
+                self._gap = None
+                events.append(_make_event(row))
+                expected = row.id + 1
+        finally:
+            db.session.remove()
+
+        if events:
+            with self._condition:
+                self._buffer.extend(events)
+                while len(self._buffer) > self.buffer_size:
+                    self._buffer_floor = self._buffer.popleft().id
+                self._floor = events[-1].id
+                self._condition.notify_all()
+
+        return len(events) == READ_BATCH_SIZE
+
+    def _gap_closed(self, missing_id):
+        """Проверка, что событие с id missing_id уже не станет видимым"""
+        if db.engine.dialect.name != 'postgresql':
+            return True
+
+        snapshot = func.txid_current_snapshot()
+        xmin, xmax = db.session.execute(
+            select(func.txid_snapshot_xmin(snapshot), func.txid_snapshot_xmax(snapshot))
+        ).one()
+        now = time.monotonic()
+        if self._gap is None or self._gap[0] != missing_id:
+            # Транзакция, получившая missing_id, имеет номер меньше xmax этого снимка
+            self._gap = (missing_id, xmax, now, False)
+        gap_id, gap_xmax, since, warned = self._gap
+        if xmin >= gap_xmax:
+            return True
+        if not warned and now - since >= GAP_WARNING_SECONDS:
+            logger.warning(f"Block event {gap_id} is held back by a transaction open for over "
+                           f"{GAP_WARNING_SECONDS} s; later events wait for it")
+            self._gap = (gap_id, gap_xmax, since, True)
+        return False
+
+
+def _make_event(row):
+    data = '{"client_identifier":%s,"block":%s}' % (json.dumps(row.client_identifier), row.payload)
+    frame = f"id: {row.id}\nevent: {row.event_type}\ndata: {data}\n\n"
+    return Event(row.id, row.event_type, data, frame)
+
+
+event_broker = EventBroker()
@@ -0,0 +1,153 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import case, select, true, update
+
+from app import db
+from cache import status_cache
+from events import event_broker
+from models import BlockEvent, ChangeSequence, Client, Lease, PaymentBlock, StatCounter
+from schemas import PaymentBlockSchema
+from snapshot_export import snapshot_exporter
+from utils import record_block_events, touch_clients
+
+logger = logging.getLogger(__name__)
+
+# Метаданные снятия блокировки по истечении срока
+EXPIRED_BY = 'system'
+EXPIRY_REASON = 'Истек срок действия блокировки'
+
+payment_block_schema = PaymentBlockSchema()
+
+
+class BlockExpirySweeper:
+    """
+    Снятие блокировок с истекшим сроком действия (expires_at) по расписанию.
+
+    Истекшие активные блокировки выбираются по индексу ix_payment_blocks_is_active_expires_at
+    порциями по EXPIRY_BATCH_SIZE; каждая порция снимается одним UPDATE в отдельной транзакции
+    вместе с записью событий block_removed, версией клиентов и счетчиками статистики, как при
+    ручной разблокировке. Фоновый поток запускается в каждом процессе, а работу выполняет
+    только держатель аренды Lease.BLOCK_EXPIRY, поэтому несколько воркеров не снимают одни
+    и те же блокировки.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = None
+        self.batch_size = 1000
+        self.lease_ttl = 60.0
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Чтение настроек EXPIRY_SWEEP_INTERVAL, EXPIRY_BATCH_SIZE и EXPIRY_LEASE_TTL"""
+        self.app = app
+        self.interval = app.config.get("EXPIRY_SWEEP_INTERVAL")
+        self.batch_size = app.config.get("EXPIRY_BATCH_SIZE", self.batch_size)
+        self.lease_ttl = app.config.get("EXPIRY_LEASE_TTL", self.lease_ttl)
+        if self.interval:
+            self._ensure_thread()
+
+    def sweep(self, now=None):
+        """
+        Снятие всех истекших блокировок в текущем контексте приложения
+
+        Аргументы:
+            now (datetime, optional): Момент, на который проверяется срок (UTC)
+
+        Возвращает:
+            int: Число снятых блокировок; 0, если аренда принадлежит другому процессу
+        """
+        now = now or datetime.utcnow()
+        total = 0
+        try:
+            while True:
+                # Аренда продлевается в транзакции каждой порции
+                if not Lease.acquire(Lease.BLOCK_EXPIRY, self.holder, self.lease_ttl):
+                    db.session.rollback()
+                    return total
+                identifiers = self._expire_batch(now)
+                db.session.commit()
+                self._blocks_changed(identifiers)
+                total += len(identifiers)
+                if len(identifiers) < self.batch_size:
+                    break
+            Lease.release(Lease.BLOCK_EXPIRY, self.holder)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return total
+
+    def _expire_batch(self, now):
+        """Снятие одной порции истекших блокировок; возвращает идентификаторы их клиентов"""
+        rows = db.session.execute(
+            select(PaymentBlock.id, Client.client_identifier)
+            .join(Client, Client.id == PaymentBlock.client_id)
+            .where(PaymentBlock.is_active == true(), PaymentBlock.expires_at <= now)
+            .order_by(PaymentBlock.expires_at)
+            .limit(self.batch_size)
+            .with_for_update(of=PaymentBlock, skip_locked=True)
+        ).all()
+        if not rows:
+            return []
+
+        identifiers = dict(rows)
+        change_seqs = dict(zip(identifiers, ChangeSequence.allocate(len(identifiers))))
+        blocks = db.session.scalars(
+            update(PaymentBlock)
+            .where(PaymentBlock.id.in_(identifiers))
+            .values(
+                is_active=False,
+                unblocked_at=PaymentBlock.expires_at,
+                unblocked_by=EXPIRED_BY,
+                unblock_reason=EXPIRY_REASON,
+                change_seq=case(change_seqs, value=PaymentBlock.id)
+            )
+            .returning(PaymentBlock),
+            execution_options={"synchronize_session": False}
+        ).all()
+
+        touch_clients(block.client_id for block in blocks)
+        StatCounter.record_unblocked(block.reason for block in blocks)
+        record_block_events(BlockEvent.BLOCK_REMOVED, [
+            (identifiers[block.id], payment_block_schema.dump(block)) for block in blocks
+        ])
+        return [identifiers[block.id] for block in blocks]
+
+    @staticmethod
+    def _blocks_changed(client_identifiers):
+        """Распространение зафиксированных снятий на кэш статуса, снимок и подписчиков событий"""
+        if not client_identifiers:
+            return
+        for client_identifier in client_identifiers:
+            status_cache.invalidate(client_identifier)
+        snapshot_exporter.request_rebuild()
+        event_broker.wake()
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="block-expiry", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    count = self.sweep()
+                if count:
+                    logger.info(f"Expired {count} payment blocks")
+            except Exception as err:
+                logger.error(f"Failed to expire payment blocks: {str(err)}")
+
+
+expiry_sweeper = BlockExpirySweeper()
@@ -0,0 +1,445 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы времени ожидания соединения из пула, в секундах
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Границы корзин гистограмм времени обработки запроса, запросов к БД и сериализации, в секундах
+REQUEST_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Границы корзин гистограммы числа SQL-запросов на HTTP-запрос
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Тип содержимого текстового формата экспозиции Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными границами корзин (как histogram в Prometheus).
+
+    Наблюдение — поиск корзины и два приращения под блокировкой, поэтому
+    гистограмму можно держать включенной в рабочем режиме.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """
+        Возвращает:
+            dict: buckets — пары (граница, накопленное число наблюдений), последняя граница '+Inf';
+                  count — число наблюдений; sum — сумма значений
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            running += count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class PoolMetrics:
+    """
+    Счетчики пула соединений SQLAlchemy.
+
+    Занятые соединения и переполнение читаются из пула в момент запроса метрик;
+    время ожидания соединения измеряет InstrumentedQueuePool, неудачные pre-ping,
+    инвалидации и таймауты собираются из событий SQLAlchemy.
+    """
+
+    def __init__(self):
+        self.checkout_wait = Histogram(POOL_WAIT_BUCKETS)
+        self.pre_ping_failures = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.connects = 0
+        self._engines = []
+        self._lock = threading.Lock()
+
+    def instrument(self, engine):
+        """Подписка на события движка; вызывается один раз для каждого движка приложения"""
+        if engine in self._engines:
+            return
+        self._engines.append(engine)
+        event.listen(engine, "handle_error", self._on_error)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "connect", self._on_connect)
+
+    def increment(self, counter):
+        """Потокобезопасное увеличение счетчика"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _on_error(self, context):
+        if getattr(context, "is_pre_ping", False):
+            self.increment("pre_ping_failures")
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.increment("invalidations")
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.increment("connects")
+
+    def render(self, exposition, engine):
+        """Добавляет метрики пула в экспозицию Prometheus"""
+        stats = self.stats(engine)
+        for name, key, help_text in (
+            ("db_pool_size", "size", "Configured number of pooled connections"),
+            ("db_pool_checked_out", "checked_out", "Connections currently checked out"),
+            ("db_pool_checked_in", "checked_in", "Idle connections in the pool"),
+            ("db_pool_overflow", "overflow", "Connections opened above the pool size"),
+        ):
+            if key in stats:
+                exposition.add("gauge", name, help_text, [({}, stats[key])])
+        exposition.add_histogram(
+            "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+            [({}, self.checkout_wait.snapshot())]
+        )
+        for name, key, help_text in (
+            ("db_pool_connects_total", "connects", "New DBAPI connections opened"),
+            ("db_pool_pre_ping_failures_total", "pre_ping_failures", "Failed pre-ping checks"),
+            ("db_pool_invalidations_total", "invalidations", "Invalidated connections"),
+            ("db_pool_timeouts_total", "timeouts", "Checkouts that timed out"),
+        ):
+            exposition.add("counter", name, help_text, [({}, stats[key])])
+
+    def stats(self, engine):
+        """Текущее состояние пула движка и накопленные счетчики"""
+        pool = engine.pool
+        stats = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        wait = self.checkout_wait.snapshot()
+        stats.update({
+            "checkout_wait": {
+                "buckets": {str(bound): count for bound, count in wait["buckets"]},
+                "count": wait["count"],
+                "sum": wait["sum"],
+            },
+            "connects": self.connects,
+            "pre_ping_failures": self.pre_ping_failures,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+        })
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, измеряющий время ожидания свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.increment("timeouts")
+            raise
+        finally:
+            pool_metrics.checkout_wait.observe(time.perf_counter() - started)
+
+
+class _RouteMetrics:
+    """Метрики одной пары (эндпоинт, HTTP-метод)"""
+
+    __slots__ = ("latency", "db_time", "serialization_time", "queries", "responses", "in_flight")
+
+    def __init__(self):
+        self.latency = Histogram(REQUEST_LATENCY_BUCKETS)
+        self.db_time = Histogram(REQUEST_LATENCY_BUCKETS)
+        self.serialization_time = Histogram(REQUEST_LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.responses = {}
+        self.in_flight = 0
+
+
+class _RequestTiming:
+    """Замеры текущего запроса, хранятся в flask.g"""
+
+    __slots__ = ("route", "started", "db", "queries", "serialization", "status")
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.serialization = 0.0
+        self.status = None
+
+
+class RequestMetrics:
+    """
+    Метрики обработки HTTP-запросов по эндпоинтам.
+
+    Для каждого эндпоинта Flask и HTTP-метода ведутся гистограммы полного времени
+    обработки, времени выполнения SQL (события курсора SQLAlchemy) и времени
+    сериализации ответа (serializers.json_response / json_line), числа SQL-запросов,
+    счетчики ответов по кодам статуса и число запросов в обработке.
+
+    Если число SQL-запросов превышает бюджет эндпоинта (QUERY_BUDGET или декоратор
+    query_budget), в режиме отладки или при QUERY_BUDGET_WARNINGS пишется предупреждение —
+    так обнаруживаются N+1 запросы. Запись — несколько вызовов
+    perf_counter и приращений под блокировкой на запрос, поэтому метрики остаются
+    включенными в рабочем режиме. Для потоковых ответов время считается до конца потока.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._engines = []
+
+    def init_app(self, app, *engines):
+        """Регистрирует обработчики запроса и подписывается на события курсора движков (основной базы и реплик)"""
+        if not app.config.get("REQUEST_METRICS", True):
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        for engine in engines:
+            if engine not in self._engines:
+                self._engines.append(engine)
+                event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def observe_serialization(self, seconds):
+        """Добавляет время сериализации к текущему запросу"""
+        timing = _current_timing()
+        if timing is not None:
+            timing.serialization += seconds
+
+    def _route(self, endpoint, method):
+        key = (endpoint, method)
+        route = self._routes.get(key)
+        if route is None:
+            with self._lock:
+                route = self._routes.setdefault(key, _RouteMetrics())
+        return route
+
+    def _before_request(self):
+        route = self._route(request.endpoint or "unmatched", request.method)
+        with self._lock:
+            route.in_flight += 1
+        g.request_timing = _RequestTiming(route)
+
+    def _after_request(self, response):
+        timing = _current_timing()
+        if timing is not None:
+            timing.status = response.status_code
+        return response
+
+    def _teardown_request(self, error=None):
+        timing = g.pop("request_timing", None)
+        if timing is None:
+            return
+        route = timing.route
+        status = timing.status if error is None and timing.status is not None else 500
+        route.latency.observe(time.perf_counter() - timing.started)
+        route.db_time.observe(timing.db)
+        route.serialization_time.observe(timing.serialization)
+        route.queries.observe(timing.queries)
+        with self._lock:
+            route.in_flight -= 1
+            route.responses[status] = route.responses.get(status, 0) + 1
+        _check_query_budget(timing.queries)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        timing = _current_timing()
+        if timing is not None:
+            timing.db += time.perf_counter() - started
+            timing.queries += 1
+
+    def render(self, exposition):
+        """Добавляет метрики запросов в экспозицию Prometheus"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            in_flight = [(route, route.in_flight) for _, route in routes]
+            responses = [dict(route.responses) for _, route in routes]
+
+        labels = [{"endpoint": endpoint, "method": method} for (endpoint, method), _ in routes]
+        exposition.add_histogram(
+            "http_request_duration_seconds", "Request latency by endpoint",
+            [(label, route.latency.snapshot()) for label, (_, route) in zip(labels, routes)]
+        )
+        exposition.add_histogram(
+            "http_request_db_seconds", "Time spent executing SQL per request",
+            [(label, route.db_time.snapshot()) for label, (_, route) in zip(labels, routes)]
+        )
+        exposition.add_histogram(
+            "http_request_serialization_seconds", "Time spent serializing the response per request",
+            [(label, route.serialization_time.snapshot()) for label, (_, route) in zip(labels, routes)]
+        )
+        exposition.add_histogram(
+            "http_request_queries", "SQL statements executed per request",
+            [(label, route.queries.snapshot()) for label, (_, route) in zip(labels, routes)]
+        )
+        exposition.add("counter", "http_requests_total", "Completed requests by status code", [
+            (dict(label, status=str(status)), count)
+            for label, counts in zip(labels, responses)
+            for status, count in sorted(counts.items())
+        ])
+        exposition.add("gauge", "http_requests_in_flight", "Requests currently being handled", [
+            (label, value) for label, (_, value) in zip(labels, in_flight)
+        ])
+
+
+def _current_timing():
+    if not has_request_context():
+        return None
+    return g.get("request_timing")
+
+
+def _check_query_budget(queries):
+    """Предупреждение о превышении бюджета SQL-запросов текущим запросом"""
+    if not (current_app.debug or current_app.config.get("QUERY_BUDGET_WARNINGS")):
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "query_budget", None)
+    if budget is None:
+        budget = current_app.config.get("QUERY_BUDGET")
+    if budget is not None and queries > budget:
+        logger.warning(
+            "%s %s executed %d SQL queries, budget is %d (endpoint %s)",
+            request.method, request.path, queries, budget, request.endpoint
+        )
+
+
+def query_budget(limit):
+    """
+    Декоратор представления: собственный бюджет SQL-запросов эндпоинта вместо QUERY_BUDGET
+
+    Применяется под декоратором route, чтобы атрибут получила зарегистрированная функция.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class QueryCounter:
+    """
+    Счетчик SQL-запросов, выполненных через движок внутри блока with
+
+    Пример:
+        with QueryCounter(db.engine) as counter:
+            client.get('/api/v1/blocks')
+        counter.count, counter.statements
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, "after_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "after_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+request_metrics = RequestMetrics()
+
+
+class Exposition:
+    """Сборщик текстового формата экспозиции Prometheus (версия 0.0.4)"""
+
+    def __init__(self):
+        self._lines = []
+
+    def add(self, metric_type, name, help_text, samples):
+        """
+        Добавляет метрику
+
+        Аргументы:
+            metric_type (str): counter или gauge
+            samples (list): Пары (метки, значение)
+        """
+        self._header(name, metric_type, help_text)
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def add_histogram(self, name, help_text, samples):
+        """Добавляет гистограмму; samples — пары (метки, Histogram.snapshot())"""
+        self._header(name, "histogram", help_text)
+        for labels, snapshot in samples:
+            for bound, count in snapshot["buckets"]:
+                self._sample(f"{name}_bucket", dict(labels, le=str(bound)), count)
+            self._sample(f"{name}_sum", labels, snapshot["sum"])
+            self._sample(f"{name}_count", labels, snapshot["count"])
+
+    def render(self):
+        return "\n".join(self._lines) + "\n"
+
+    def _header(self, name, metric_type, help_text):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {metric_type}")
+
+    def _sample(self, name, labels, value):
+        if labels:
+            rendered = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+            name = f"{name}{{{rendered}}}"
+        self._lines.append(f"{name} {value}")
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_cache_metrics(exposition, caches):
+    """
+    Добавляет счетчики кэшей в экспозицию Prometheus
+
+    Аргументы:
+        caches (dict): Имя кэша -> TTLCache.stats()
+    """
+    names = sorted(caches)
+    exposition.add("gauge", "cache_entries", "Entries currently held by the cache", [
+        ({"cache": name}, caches[name]["size"]) for name in names
+    ])
+    for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        exposition.add("counter", f"cache_{key}_total", f"Cache {key}", [
+            ({"cache": name}, caches[name][key]) for name in names
+        ])
@@ -1,5 +1,11 @@
 import enum
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import DDL, case, delete, event, exists, func, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db
 
 class BlockReason(enum.Enum):
@@ -20,7 +26,8 @@ class Client(db.Model):
     client_identifier = db.Column(db.String(50), unique=True, nullable=False, index=True)  # ИНН, ОГРН или другой идентификатор
     name = db.Column(db.String(100), nullable=False)  # Наименование организации
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)  # Увеличивается при каждом изменении блокировок клиента
     
     # Связь с моделью блокировки платежей
     payment_blocks = db.relationship('PaymentBlock', back_populates='client', cascade='all, delete-orphan')
@@ -28,17 +35,69 @@ class Client(db.Model):
     def __repr__(self):
         return f'<Клиент {self.client_identifier}>'
 
-    @property
+    @hybrid_property
     def is_blocked(self):
         """Проверка наличия активной блокировки платежей у клиента"""
-        active_blocks = [block for block in self.payment_blocks if block.is_active]
-        return len(active_blocks) > 0
+        return self.active_block is not None
+    
+    @is_blocked.inplace.expression
+    @classmethod
+    def _is_blocked_expression(cls):
+        """
+        SQL-форма is_blocked: подзапрос EXISTS по индексу активных блокировок,
+        поэтому стоимость не зависит от числа блокировок в истории клиента
+        """
+        return exists().where(PaymentBlock.client_id == cls.id, PaymentBlock.active_predicate())
     
     @property
     def active_block(self):
-        """Возвращает активную блокировку, если таковая имеется"""
-        active_blocks = [block for block in self.payment_blocks if block.is_active]
-        return active_blocks[0] if active_blocks else None
+        """
+        Возвращает активную блокировку, если таковая имеется
+        
+        Если история блокировок уже загружена, она просматривается в памяти; иначе
+        выполняется один запрос по частичному индексу активных блокировок вместо
+        загрузки всей истории клиента.
+        """
+        if 'payment_blocks' in self.__dict__:
+            return next((block for block in self.payment_blocks if block.is_active), None)
+        return PaymentBlock.query.filter(PaymentBlock.client_id == self.id, PaymentBlock.active_predicate()).first()
+
+# Поиск клиентов по подстроке (см. search.py): в SQLite внешняя таблица FTS5 с токенизатором
+# trigram, поддерживаемая триггерами; в PostgreSQL индексы GIN pg_trgm, обслуживающие ILIKE.
+# Триггер обновления срабатывает только при изменении индексируемых столбцов
+CLIENT_SEARCH_TABLE = 'clients_fts'
+CLIENT_SEARCH_DDL = {
+    'sqlite': (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {CLIENT_SEARCH_TABLE} USING fts5("
+        f"client_identifier, name, content='clients', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {CLIENT_SEARCH_TABLE}_insert AFTER INSERT ON clients BEGIN "
+        f"INSERT INTO {CLIENT_SEARCH_TABLE}(rowid, client_identifier, name) "
+        f"VALUES (new.id, new.client_identifier, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {CLIENT_SEARCH_TABLE}_delete AFTER DELETE ON clients BEGIN "
+        f"INSERT INTO {CLIENT_SEARCH_TABLE}({CLIENT_SEARCH_TABLE}, rowid, client_identifier, name) "
+        f"VALUES ('delete', old.id, old.client_identifier, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {CLIENT_SEARCH_TABLE}_update "
+        f"AFTER UPDATE OF client_identifier, name ON clients BEGIN "
+        f"INSERT INTO {CLIENT_SEARCH_TABLE}({CLIENT_SEARCH_TABLE}, rowid, client_identifier, name) "
+        f"VALUES ('delete', old.id, old.client_identifier, old.name); "
+        f"INSERT INTO {CLIENT_SEARCH_TABLE}(rowid, client_identifier, name) "
+        f"VALUES (new.id, new.client_identifier, new.name); END",
+    ),
+    'postgresql': (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_clients_name_trgm ON clients USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_clients_client_identifier_trgm "
+        "ON clients USING gin (client_identifier gin_trgm_ops)",
+    ),
+}
+for _dialect, _statements in CLIENT_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Client.__table__, 'after_create', DDL(_statement).execute_if(dialect=_dialect))
+event.listen(
+    Client.__table__,
+    'before_drop',
+    DDL(f"DROP TABLE IF EXISTS {CLIENT_SEARCH_TABLE}").execute_if(dialect='sqlite')
+)
 
 class PaymentBlock(db.Model):
     """
@@ -59,21 +118,404 @@ class PaymentBlock(db.Model):
     # Метки времени
     blocked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     unblocked_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)  # Срок действия; по истечении блокировку снимает expiry.py
     
     # Метаданные блокировки
     blocked_by = db.Column(db.String(100), nullable=False)  # Сотрудник, создавший блокировку
     unblocked_by = db.Column(db.String(100), nullable=True)  # Сотрудник, снявший блокировку
     unblock_reason = db.Column(db.Text, nullable=True)  # Причина разблокировки
     
+    # Номер последнего изменения блокировки (см. ChangeSequence)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    
     # Связь с моделью клиента
     client = db.relationship('Client', back_populates='payment_blocks')
     
+    __table_args__ = (
+        # Не более одной активной блокировки на клиента; ограничение обеспечивает ответ 409
+        db.Index(
+            'uq_payment_blocks_active_client',
+            client_id,
+            unique=True,
+            postgresql_where=is_active,
+            sqlite_where=is_active,
+        ),
+        # Keyset-пагинация списка блокировок по (blocked_at, id)
+        db.Index('ix_payment_blocks_blocked_at_id', blocked_at, id),
+        # История блокировок клиента в хронологическом порядке
+        db.Index('ix_payment_blocks_client_id_blocked_at', client_id, blocked_at, id),
+        # Лента изменений: выборка изменений после заданного номера
+        db.Index('ix_payment_blocks_change_seq', change_seq, unique=True),
+        # Поиск истекших активных блокировок фоновым снятием (см. expiry.py)
+        db.Index('ix_payment_blocks_is_active_expires_at', is_active, expires_at),
+    )
+    
     def __repr__(self):
         return f'<Блокировка платежа {self.id} для клиента {self.client_id}>'
     
+    @classmethod
+    def active_predicate(cls):
+        """
+        Условие активной блокировки в том же виде, что и условие индекса uq_payment_blocks_active_client
+        
+        SQLite применяет частичный индекс, только если условие запроса дословно совпадает
+        с условием индекса, а столбец Boolean в запросах SQLAlchemy сравнивается как
+        is_active = 1; поэтому условие записывается как в определении индекса.
+        """
+        return text(f'{cls.__tablename__}.is_active')
+    
     def unblock(self, unblocked_by, reason=None):
-        """Разблокировка платежа путем установки is_active в False и записи метаданных"""
-        self.is_active = False
-        self.unblocked_at = datetime.utcnow()
-        self.unblocked_by = unblocked_by
-        self.unblock_reason = reason
+        """
+        Разблокировка платежа путем установки is_active в False и записи метаданных
+        
+        Изменение выполняется условным UPDATE по активной строке, поэтому из параллельных
+        разблокировок (и фонового снятия по сроку) блокировку снимает только одна.
+        
+        Возвращает:
+            bool: False, если блокировка уже снята другой транзакцией
+        """
+        values = {
+            'is_active': False,
+            'unblocked_at': datetime.utcnow(),
+            'unblocked_by': unblocked_by,
+            'unblock_reason': reason,
+            'change_seq': ChangeSequence.allocate()[0],
+        }
+        result = db.session.execute(
+            update(PaymentBlock).where(PaymentBlock.id == self.id, self.active_predicate()).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+        if result.rowcount != 1:
+            return False
+        for name, value in values.items():
+            set_committed_value(self, name, value)
+        StatCounter.record_unblocked([self.reason])
+        return True
+
+class ChangeSequence(db.Model):
+    """
+    Модель, хранящая счетчик номеров изменений.
+    
+    PostgreSQL: номер изменения составляется из номера транзакции (txid_current()) и порядкового
+    номера изменения в ней, поэтому выделение номеров не блокирует строк и не упорядочивает
+    пишущие транзакции между собой. Транзакции, которые еще могут зафиксироваться, имеют номер
+    не меньше txid_snapshot_xmin(txid_current_snapshot()); лента изменений читает только номера
+    ниже этой границы (см. watermark), поэтому изменение, зафиксированное позже изменения
+    с большим номером, не пропускается.
+    
+    SQLite допускает одну пишущую транзакцию, поэтому номера выдаются строкой счетчика:
+    она обновляется внутри уже удерживаемой блокировки записи и не добавляет ожидания.
+    """
+    __tablename__ = 'change_sequences'
+    
+    PAYMENT_BLOCKS = 'payment_blocks'
+    
+    # Число номеров изменений, доступных одной транзакции PostgreSQL
+    PER_TRANSACTION = 1 << 20
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, default=0, nullable=False)  # Последний выданный номер
+    
+    def __repr__(self):
+        return f'<Счетчик изменений {self.name}: {self.value}>'
+    
+    @classmethod
+    def allocate(cls, count=1, name=PAYMENT_BLOCKS):
+        """
+        Выделение следующих номеров изменений в текущей транзакции
+        
+        Возвращает:
+            range: count последовательных номеров
+        """
+        if db.engine.dialect.name == 'postgresql':
+            return cls._allocate_in_transaction(count)
+        last = db.session.execute(
+            update(cls).where(cls.name == name).values(value=cls.value + count).returning(cls.value),
+            execution_options={"synchronize_session": False}
+        ).scalar_one()
+        return range(last - count + 1, last + 1)
+    
+    @classmethod
+    def _allocate_in_transaction(cls, count):
+        # Номер транзакции и число уже выданных в ней номеров хранятся в сессии
+        txid = db.session.execute(select(func.txid_current())).scalar_one()
+        current, used = db.session.info.get('change_seq', (None, 0))
+        if current != txid:
+            used = 0
+        if used + count > cls.PER_TRANSACTION:
+            raise ValueError(f"A transaction can record at most {cls.PER_TRANSACTION} block changes")
+        db.session.info['change_seq'] = (txid, used + count)
+        start = txid * cls.PER_TRANSACTION + used
+        return range(start, start + count)
+    
+    @classmethod
+    def watermark(cls):
+        """
+        Граница видимости ленты изменений
+        
+        Возвращает:
+            SQL-выражение: номера изменений ниже него уже зафиксированы или не появятся никогда;
+            None, если номера становятся видимыми в порядке возрастания (SQLite)
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return None
+        return func.txid_snapshot_xmin(func.txid_current_snapshot()) * cls.PER_TRANSACTION
+
+# Строка счетчика создается вместе с таблицей
+event.listen(
+    ChangeSequence.__table__,
+    'after_create',
+    DDL(f"INSERT INTO change_sequences (name, value) VALUES ('{ChangeSequence.PAYMENT_BLOCKS}', 0)")
+)
+
+class StatCounter(db.Model):
+    """
+    Модель, хранящая счетчики для статистики блокировок (включается настройкой STAT_COUNTERS).
+    Счетчики изменяются в тех же транзакциях, что создают клиентов и создают или снимают
+    блокировки, поэтому статистика читается из нескольких строк без подсчета по таблицам.
+    Блокировки за последние дни считаются по дням (UTC) в строках blocks.day.<дата>,
+    которые создаются при первой блокировке дня.
+    """
+    __tablename__ = 'stat_counters'
+    
+    CLIENTS = 'clients'
+    DAY_PREFIX = 'blocks.day.'
+    
+    # Число последних календарных дней (включая текущий) в статистике recent_blocks
+    RECENT_DAYS = 7
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<Счетчик {self.name}: {self.value}>'
+    
+    @staticmethod
+    def blocks_key(reason):
+        """Имя счетчика всех блокировок по причине"""
+        return f'blocks.{reason.value}'
+    
+    @staticmethod
+    def active_key(reason):
+        """Имя счетчика активных блокировок по причине"""
+        return f'active_blocks.{reason.value}'
+    
+    @classmethod
+    def day_key(cls, day):
+        """Имя счетчика блокировок, созданных за день day (date)"""
+        return f'{cls.DAY_PREFIX}{day.isoformat()}'
+    
+    @classmethod
+    def recent_days(cls, now=None):
+        """Дни, входящие в статистику recent_blocks: текущий (UTC) и RECENT_DAYS - 1 предыдущих"""
+        today = (now or datetime.utcnow()).date()
+        return [today - timedelta(days=offset) for offset in range(cls.RECENT_DAYS)]
+    
+    @classmethod
+    def names(cls):
+        """Имена всех счетчиков, кроме дневных"""
+        return [cls.CLIENTS] + [key(reason) for reason in BlockReason for key in (cls.blocks_key, cls.active_key)]
+    
+    @staticmethod
+    def enabled():
+        return current_app.config.get('STAT_COUNTERS', False)
+    
+    @classmethod
+    def add(cls, deltas):
+        """
+        Прибавление значений к счетчикам в текущей транзакции одним запросом UPDATE
+        
+        Аргументы:
+            deltas (dict): Приращения по имени счетчика
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas or not cls.enabled():
+            return
+        days = {name: deltas.pop(name) for name in list(deltas) if name.startswith(cls.DAY_PREFIX)}
+        if deltas:
+            db.session.execute(
+                update(cls).where(cls.name.in_(deltas)).values(value=cls.value + case(deltas, value=cls.name)),
+                execution_options={"synchronize_session": False}
+            )
+        if days:
+            cls._upsert(days, increment=True)
+    
+    @classmethod
+    def _upsert(cls, values, increment):
+        """Создание или изменение дневных счетчиков одним INSERT ... ON CONFLICT DO UPDATE"""
+        dialect_insert = _COUNTER_UPSERT_INSERTS[db.engine.dialect.name]
+        stmt = dialect_insert(cls).values([{'name': name, 'value': values[name]} for name in sorted(values)])
+        value = cls.value + stmt.excluded.value if increment else stmt.excluded.value
+        db.session.execute(stmt.on_conflict_do_update(index_elements=[cls.name], set_={'value': value}))
+    
+    @classmethod
+    def record_created(cls, blocks):
+        """
+        Учет созданных блокировок
+        
+        Аргументы:
+            blocks (iterable): Тройки (причина, активна ли блокировка, blocked_at)
+        """
+        first_day = cls.recent_days()[-1]
+        deltas = Counter()
+        for reason, is_active, blocked_at in blocks:
+            deltas[cls.blocks_key(reason)] += 1
+            if is_active:
+                deltas[cls.active_key(reason)] += 1
+            # Дневные счетчики ведутся только для дней, которые еще попадут в статистику
+            if blocked_at.date() >= first_day:
+                deltas[cls.day_key(blocked_at.date())] += 1
+        cls.add(deltas)
+    
+    @classmethod
+    def record_unblocked(cls, reasons):
+        """Учет снятых блокировок по их причинам"""
+        cls.add({name: -count for name, count in Counter(map(cls.active_key, reasons)).items()})
+    
+    @classmethod
+    def rebuild(cls):
+        """
+        Пересчет всех счетчиков по таблицам clients и payment_blocks в текущей транзакции
+        
+        Строки счетчиков блокируются до подсчета, поэтому транзакции, изменяющие блокировки
+        параллельно, применят свои приращения уже к пересчитанным значениям.
+        """
+        existing = {counter.name for counter in cls.query.with_for_update()}
+        db.session.add_all(cls(name=name, value=0) for name in cls.names() if name not in existing)
+        db.session.flush()
+        
+        values = dict.fromkeys(cls.names(), 0)
+        values[cls.CLIENTS] = db.session.query(func.count(Client.id)).scalar()
+        for reason, total, active in db.session.query(
+            PaymentBlock.reason,
+            func.count(PaymentBlock.id),
+            func.sum(case((PaymentBlock.is_active, 1), else_=0))
+        ).group_by(PaymentBlock.reason):
+            values[cls.blocks_key(reason)] = total
+            values[cls.active_key(reason)] = active or 0
+        db.session.execute(update(cls), [{'name': name, 'value': value} for name, value in values.items()])
+        
+        # Дневные счетчики пересчитываются за RECENT_DAYS дней, более старые удаляются
+        days = cls.recent_days()
+        day_values = {cls.day_key(day): 0 for day in days}
+        for day, count in db.session.query(
+            func.date(PaymentBlock.blocked_at), func.count(PaymentBlock.id)
+        ).filter(PaymentBlock.blocked_at >= datetime.combine(days[-1], datetime.min.time())).group_by(
+            func.date(PaymentBlock.blocked_at)
+        ):
+            day = day if isinstance(day, date) else date.fromisoformat(day)
+            day_values[cls.day_key(day)] = count
+        db.session.execute(
+            delete(cls).where(cls.name.startswith(cls.DAY_PREFIX), cls.name.notin_(day_values)),
+            execution_options={"synchronize_session": False}
+        )
+        cls._upsert(day_values, increment=False)
+        values.update(day_values)
+        return values
+
+# Вставка дневных счетчиков с приращением существующих строк
+_COUNTER_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Строки счетчиков создаются вместе с таблицей
+event.listen(
+    StatCounter.__table__,
+    'after_create',
+    DDL("INSERT INTO stat_counters (name, value) VALUES "
+        + ", ".join(f"('{name}', 0)" for name in StatCounter.names()))
+)
+
+class BlockEvent(db.Model):
+    """
+    Модель, представляющая событие изменения блокировки (создание или снятие).
+    Записывается в той же транзакции, что и изменение, и служит журналом
+    для потоковой доставки событий подписчикам с возобновлением по id.
+    """
+    __tablename__ = 'block_events'
+    
+    BLOCK_CREATED = 'block_created'
+    BLOCK_REMOVED = 'block_removed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    block_id = db.Column(db.Integer, db.ForeignKey('payment_blocks.id'), nullable=False)
+    client_identifier = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # Состояние блокировки в формате JSON на момент события
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<Событие {self.id} {self.event_type} блокировки {self.block_id}>'
+
+class ImportCheckpoint(db.Model):
+    """
+    Модель, хранящая прогресс импорта исторических блокировок.
+    Обновляется в той же транзакции, что и загружаемая порция строк,
+    поэтому прерванный импорт продолжается с последней зафиксированной порции.
+    """
+    __tablename__ = 'import_checkpoints'
+    
+    source = db.Column(db.String(255), primary_key=True)  # Имя задания импорта
+    rows_committed = db.Column(db.Integer, default=0, nullable=False)  # Обработано строк источника
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Импорт {self.source}: {self.rows_committed} строк>'
+
+class Lease(db.Model):
+    """
+    Модель, хранящая аренду фоновой задачи.
+    Задачу, запущенную в нескольких процессах, выполняет только держатель аренды;
+    если держатель перестал продлевать аренду, по истечении срока ее забирает другой процесс.
+    """
+    __tablename__ = 'leases'
+    
+    BLOCK_EXPIRY = 'block_expiry'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(255), nullable=True)  # Процесс, владеющий арендой
+    expires_at = db.Column(db.DateTime, nullable=True)  # Срок аренды, если ее не продлить
+    
+    def __repr__(self):
+        return f'<Аренда {self.name}: {self.holder} до {self.expires_at}>'
+    
+    @classmethod
+    def acquire(cls, name, holder, ttl):
+        """
+        Получение или продление аренды в текущей транзакции
+        
+        Условный UPDATE выполняется атомарно: из нескольких процессов аренду получает
+        только один, остальные увидят измененную строку и не пройдут условие.
+        
+        Аргументы:
+            name (str): Имя аренды
+            holder (str): Идентификатор процесса
+            ttl (float): Срок аренды в секундах
+            
+        Возвращает:
+            bool: True, если аренда принадлежит holder
+        """
+        now = datetime.utcnow()
+        result = db.session.execute(
+            update(cls)
+            .where(cls.name == name, or_(cls.holder == holder, cls.expires_at.is_(None), cls.expires_at <= now))
+            .values(holder=holder, expires_at=now + timedelta(seconds=ttl)),
+            execution_options={"synchronize_session": False}
+        )
+        return result.rowcount == 1
+    
+    @classmethod
+    def release(cls, name, holder):
+        """Освобождение аренды, чтобы другой процесс мог получить ее без ожидания срока"""
+        db.session.execute(
+            update(cls).where(cls.name == name, cls.holder == holder).values(holder=None, expires_at=None),
+            execution_options={"synchronize_session": False}
+        )
+
+# Строки аренды создаются вместе с таблицей
+event.listen(
+    Lease.__table__,
+    'after_create',
+    DDL(f"INSERT INTO leases (name) VALUES ('{Lease.BLOCK_EXPIRY}')")
+)
@@ -0,0 +1,115 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from app import db
+
+# Режимы подсчета общего числа записей для постраничных ответов
+TOTAL_EXACT = 'exact'
+TOTAL_ESTIMATE = 'estimate'
+TOTAL_NONE = 'none'
+TOTAL_MODES = (TOTAL_EXACT, TOTAL_ESTIMATE, TOTAL_NONE)
+
+
+class InvalidCursorError(ValueError):
+    """Курсор постраничной навигации поврежден или не может быть разобран"""
+
+
+def encode_cursor(timestamp, row_id):
+    """
+    Кодирование позиции (метка времени, id) в непрозрачный курсор
+
+    Аргументы:
+        timestamp (datetime): Метка времени последней записи страницы
+        row_id (int): Первичный ключ последней записи страницы
+
+    Возвращает:
+        str: Курсор в кодировке base64url без выравнивания
+    """
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """
+    Разбор курсора, полученного от клиента
+
+    Аргументы:
+        cursor (str): Курсор, ранее выданный encode_cursor
+
+    Возвращает:
+        tuple: (timestamp, row_id)
+
+    Исключения:
+        InvalidCursorError: Если курсор не удалось разобрать
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as err:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from err
+
+
+def apply_keyset(query, timestamp_column, id_column, cursor=None):
+    """
+    Применение keyset-пагинации по убыванию (timestamp_column, id_column)
+
+    В отличие от OFFSET, стоимость получения страницы не зависит от ее номера:
+    условие (timestamp, id) < (курсор) обслуживается составным индексом по этим столбцам.
+
+    Аргументы:
+        query: Запрос SQLAlchemy
+        timestamp_column: Столбец метки времени
+        id_column: Столбец первичного ключа (для однозначного порядка)
+        cursor (str, optional): Курсор предыдущей страницы
+
+    Возвращает:
+        Запрос с условием и сортировкой для следующей страницы
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id))
+
+    return query.order_by(timestamp_column.desc(), id_column.desc())
+
+
+def count_rows(query, mode=TOTAL_EXACT):
+    """
+    Подсчет общего числа записей запроса в выбранном режиме
+
+    Аргументы:
+        query: Запрос SQLAlchemy без сортировки и пагинации
+        mode (str): 'exact' — точный COUNT, 'estimate' — оценка планировщика
+                    (только PostgreSQL, для остальных СУБД выполняется точный подсчет),
+                    'none' — подсчет не выполняется
+
+    Возвращает:
+        tuple: (total, is_estimate)
+            total (int): Число записей или None для режима 'none'
+            is_estimate (bool): True, если значение является оценкой
+    """
+    if mode == TOTAL_NONE:
+        return None, False
+
+    if mode == TOTAL_ESTIMATE and db.engine.dialect.name == 'postgresql':
+        return _estimate_count(query), True
+
+    return query.count(), False
+
+
+def _estimate_count(query):
+    """Оценка числа строк по плану запроса PostgreSQL без его выполнения"""
+    compiled = query.statement.compile(
+        dialect=db.engine.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    plan = db.session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}",
+        execution_options={"no_parameters": True}
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
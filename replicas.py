@@ -0,0 +1,212 @@
+"""
+Маршрутизация чтения на реплики базы данных
+
+Эндпоинты, отмеченные декоратором replica_reads, выполняют запросы на одной из реплик
+DATABASE_REPLICA_URLS (по кругу среди исправных); запись, фоновые задачи и остальные
+эндпоинты используют основную базу. Исправность реплик проверяется фоновым потоком
+(SELECT 1 и, для PostgreSQL, отставание воспроизведения журнала), а ошибка соединения
+во время запроса сразу исключает реплику до следующей успешной проверки. Если исправных
+реплик нет, чтение выполняется на основной базе.
+
+Клиент, которому нужно увидеть собственное только что выполненное изменение, передает
+заголовок X-Read-Your-Writes: true — тогда запрос читает основную базу в обход реплик
+и кэша статуса.
+"""
+import itertools
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import make_url
+
+from config import engine_options
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+# Отставание реплики PostgreSQL в секундах (NULL на основной базе и до первого воспроизведения)
+_POSTGRESQL_LAG = text("SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+
+
+def replica_reads(view):
+    """
+    Декоратор представления: запросы эндпоинта читают реплику
+
+    Применяется под декоратором route, чтобы атрибут получила зарегистрированная функция.
+    Эндпоинт не должен изменять данные: реплика доступна только для чтения.
+    """
+    view.replica_reads = True
+    return view
+
+
+def read_your_writes():
+    """Проверка, что текущий запрос требует чтения собственных изменений с основной базы"""
+    if not has_request_context():
+        return False
+    return request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true", "yes")
+
+
+class Replica:
+    """Движок реплики и ее состояние"""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag = None
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для запросов, отмеченных replica_reads.
+
+    Выбранный движок сохраняется в g на время запроса; RoutingSession возвращает его
+    для всех операций, кроме сброса изменений (flush), которые всегда идут на основную базу.
+    """
+
+    def __init__(self):
+        self.replicas = []
+        self.health_interval = 5.0
+        self.max_lag = None
+        self.fallbacks = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def engines(self):
+        return [replica.engine for replica in self.replicas]
+
+    def init_app(self, app):
+        """Создание движков реплик из SQLALCHEMY_REPLICA_URLS и запуск проверки исправности"""
+        self.health_interval = app.config.get("REPLICA_HEALTH_INTERVAL", self.health_interval)
+        self.max_lag = app.config.get("REPLICA_MAX_LAG")
+        self.replicas = []
+        for index, url in enumerate(app.config.get("SQLALCHEMY_REPLICA_URLS") or ()):
+            # Ожидание соединений реплик не смешивается с метриками пула основной базы
+            options = engine_options(url)
+            options.pop("poolclass", None)
+            replica = Replica(str(index), create_engine(url, **options))
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+            self.replicas.append(replica)
+            logger.info(f"Read replica {index}: {make_url(url).render_as_string(hide_password=True)}")
+
+        if self.replicas:
+            app.before_request(self._before_request)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+                self._thread.start()
+
+    def choose(self):
+        """Следующая исправная реплика по кругу или None, если исправных нет"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        replica = healthy[next(self._counter) % len(healthy)]
+        with self._lock:
+            replica.reads += 1
+        return replica
+
+    def current_engine(self):
+        """Движок реплики, выбранный для текущего запроса, или None для основной базы"""
+        if not has_app_context():
+            return None
+        return g.get("db_replica")
+
+    def stats(self):
+        """Состояние реплик и счетчики чтения"""
+        return {
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "lag_seconds": replica.lag,
+                    "reads": replica.reads,
+                    "failures": replica.failures,
+                }
+                for replica in self.replicas
+            ],
+            "primary_fallbacks": self.fallbacks,
+        }
+
+    def render(self, exposition):
+        """Добавляет метрики реплик в экспозицию Prometheus"""
+        if not self.replicas:
+            return
+        exposition.add("gauge", "db_replica_healthy", "Whether the read replica passes health checks", [
+            ({"replica": replica.name}, int(replica.healthy)) for replica in self.replicas
+        ])
+        exposition.add("gauge", "db_replica_lag_seconds", "Replay lag of the read replica", [
+            ({"replica": replica.name}, replica.lag) for replica in self.replicas if replica.lag is not None
+        ])
+        exposition.add("counter", "db_replica_reads_total", "Requests routed to the read replica", [
+            ({"replica": replica.name}, replica.reads) for replica in self.replicas
+        ])
+        exposition.add("counter", "db_replica_fallbacks_total",
+                       "Replica-eligible requests served by the primary because no replica was healthy",
+                       [({}, self.fallbacks)])
+
+    def _before_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if not getattr(view, "replica_reads", False) or read_your_writes():
+            return
+        replica = self.choose()
+        if replica is not None:
+            g.db_replica = replica.engine
+
+    def _on_error(self, replica):
+        def listener(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                self._mark(replica, healthy=False)
+        return listener
+
+    def _mark(self, replica, healthy, lag=None):
+        if replica.healthy != healthy:
+            logger.warning(f"Read replica {replica.name} is {'healthy' if healthy else 'unavailable'}")
+        if not healthy:
+            replica.failures += 1
+        replica.healthy = healthy
+        replica.lag = lag
+
+    def _check(self, replica):
+        try:
+            with replica.engine.connect() as connection:
+                lag = None
+                if replica.engine.dialect.name == "postgresql":
+                    lag = connection.execute(_POSTGRESQL_LAG).scalar()
+                    lag = float(lag) if lag is not None else 0.0
+                else:
+                    connection.execute(text("SELECT 1"))
+        except Exception as err:
+            logger.debug(f"Read replica {replica.name} health check failed: {str(err)}")
+            self._mark(replica, healthy=False)
+            return
+        self._mark(replica, healthy=self.max_lag is None or lag is None or lag <= self.max_lag, lag=lag)
+
+    def _run(self):
+        while True:
+            for replica in self.replicas:
+                self._check(replica)
+            time.sleep(self.health_interval)
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """Сессия Flask-SQLAlchemy, читающая реплику в запросах, отмеченных replica_reads"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            engine = replica_router.current_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
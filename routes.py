@@ -1,22 +1,24 @@
 import os
 import logging
-from flask import render_template, send_from_directory
-from app import app
+from flask import Blueprint, render_template, send_from_directory
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-@app.route('/')
+# Create Blueprint for the landing page and documentation
+pages_bp = Blueprint('pages', __name__)
+
+@pages_bp.route('/')
 def index():
     """Render landing page with API overview"""
     return render_template('index.html')
 
-@app.route('/docs')
+@pages_bp.route('/docs')
 def documentation():
     """Render API documentation page using OpenAPI spec"""
     return render_template('documentation.html')
 
-@app.route('/openapi.yaml')
+@pages_bp.route('/openapi.yaml')
 def openapi_spec():
     """Serve the OpenAPI specification file"""
     return send_from_directory('static', 'openapi.yaml')
@@ -1,4 +1,5 @@
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from datetime import datetime, timezone
+from marshmallow import EXCLUDE, Schema, fields, validate, validates, ValidationError
 from models import BlockReason
 
 class ClientSchema(Schema):
@@ -10,6 +11,9 @@ class ClientSchema(Schema):
     updated_at = fields.DateTime(dump_only=True)
     is_blocked = fields.Boolean(dump_only=True)
 
+# Сообщение об ошибке причины блокировки формируется один раз
+INVALID_REASON_MESSAGE = f"Недопустимая причина блокировки. Должна быть одной из: {', '.join([r.value for r in BlockReason])}"
+
 class BlockReasonField(fields.Field):
     """Пользовательское поле для перечисления BlockReason"""
     def _serialize(self, value, attr, obj, **kwargs):
@@ -21,7 +25,20 @@ class BlockReasonField(fields.Field):
         try:
             return BlockReason(value)
         except ValueError:
-            raise ValidationError(f"Недопустимая причина блокировки. Должна быть одной из: {', '.join([r.value for r in BlockReason])}")
+            raise ValidationError(INVALID_REASON_MESSAGE)
+
+class UtcDateTimeField(fields.DateTime):
+    """Дата и время в ISO 8601; значение с часовым поясом приводится к UTC без пояса, как метки времени в БД"""
+    def _deserialize(self, value, attr, data, **kwargs):
+        result = super()._deserialize(value, attr, data, **kwargs)
+        if result.tzinfo is not None:
+            result = result.astimezone(timezone.utc).replace(tzinfo=None)
+        return result
+
+def validate_future(value):
+    """Проверка, что срок действия блокировки еще не наступил"""
+    if value <= datetime.utcnow():
+        raise ValidationError("Срок действия блокировки должен быть в будущем")
 
 class PaymentBlockSchema(Schema):
     """Схема для сериализации и валидации модели PaymentBlock"""
@@ -32,6 +49,7 @@ class PaymentBlockSchema(Schema):
     is_active = fields.Boolean(dump_only=True)
     blocked_at = fields.DateTime(dump_only=True)
     unblocked_at = fields.DateTime(dump_only=True)
+    expires_at = fields.DateTime(dump_only=True)
     blocked_by = fields.String(required=True, validate=validate.Length(min=1, max=100))
     unblocked_by = fields.String(dump_only=True)
     unblock_reason = fields.String(dump_only=True)
@@ -42,6 +60,20 @@ class BlockPaymentSchema(Schema):
     reason = BlockReasonField(required=True)
     details = fields.String(required=False, allow_none=True)
     blocked_by = fields.String(required=True, validate=validate.Length(min=1, max=100))
+    expires_at = UtcDateTimeField(required=False, allow_none=True, validate=validate_future)
+
+class ImportBlockSchema(BlockPaymentSchema):
+    """Схема для строки импорта исторических блокировок; дополняет правила BlockPaymentSchema"""
+    class Meta:
+        unknown = EXCLUDE
+    
+    client_name = fields.String(required=False, allow_none=True, validate=validate.Length(min=1, max=100))
+    is_active = fields.Boolean(required=False)
+    blocked_at = UtcDateTimeField(required=False)
+    unblocked_at = UtcDateTimeField(required=False, allow_none=True)
+    expires_at = UtcDateTimeField(required=False, allow_none=True)  # Исторические сроки могут быть в прошлом
+    unblocked_by = fields.String(required=False, allow_none=True, validate=validate.Length(max=100))
+    unblock_reason = fields.String(required=False, allow_none=True)
 
 class UnblockPaymentSchema(Schema):
     """Схема для разблокировки платежей клиента"""
@@ -49,12 +81,28 @@ class UnblockPaymentSchema(Schema):
     unblocked_by = fields.String(required=True, validate=validate.Length(min=1, max=100))
     reason = fields.String(required=False, allow_none=True)
 
+class BulkBlockPaymentSchema(Schema):
+    """Схема для пакетной блокировки платежей клиентов; элементы проверяются BlockPaymentSchema"""
+    items = fields.List(fields.Dict(), required=True, validate=validate.Length(min=1, max=1000))
+
+class BulkUnblockPaymentSchema(Schema):
+    """Схема для пакетной разблокировки платежей клиентов; элементы проверяются UnblockPaymentSchema"""
+    items = fields.List(fields.Dict(), required=True, validate=validate.Length(min=1, max=1000))
+
 class ClientStatusSchema(Schema):
     """Схема для ответа о статусе блокировки клиента"""
     client_identifier = fields.String()
     is_blocked = fields.Boolean()
     block_details = fields.Nested(PaymentBlockSchema, allow_none=True)
 
+class BatchStatusRequestSchema(Schema):
+    """Схема для пакетной проверки статуса блокировки клиентов"""
+    client_identifiers = fields.List(
+        fields.String(validate=validate.Length(min=1, max=50)),
+        required=True,
+        validate=validate.Length(min=1, max=5000)
+    )
+
 class ClientBlockHistorySchema(Schema):
     """Схема для ответа с историей блокировок клиента"""
     client_identifier = fields.String()
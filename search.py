@@ -0,0 +1,84 @@
+"""
+Поиск клиентов по подстроке наименования и идентификатора
+
+PostgreSQL: индексы GIN с триграммами pg_trgm по clients.name и clients.client_identifier
+обслуживают ILIKE '%...%', результаты упорядочиваются по similarity().
+SQLite: внешняя таблица FTS5 clients_fts с токенизатором trigram поддерживается триггерами
+на таблице clients; результаты упорядочиваются по bm25.
+
+В обоих случаях регистр не учитывается, в том числе для кириллицы, а точное совпадение
+идентификатора и совпадения по префиксу ставятся выше остальных. Строки короче трех
+символов не раскладываются на триграммы и ищутся полным просмотром.
+"""
+from sqlalchemy import DDL, case, column, func, or_, select, table
+
+from app import db
+from models import CLIENT_SEARCH_DDL, CLIENT_SEARCH_TABLE, Client
+
+# Минимальная длина строки поиска, при которой используется триграммный индекс
+MIN_INDEXED_LENGTH = 3
+
+_fts = table(CLIENT_SEARCH_TABLE, column('rowid'), column('rank'), column(CLIENT_SEARCH_TABLE))
+
+
+def ensure_search_index():
+    """
+    Создание недостающих объектов поиска в существующей базе и переиндексация (SQLite)
+
+    Возвращает:
+        str: Имя диалекта, для которого выполнена подготовка
+    """
+    dialect = db.engine.dialect.name
+    for statement in CLIENT_SEARCH_DDL.get(dialect, ()):
+        db.session.execute(DDL(statement))
+    if dialect == 'sqlite':
+        db.session.execute(_fts.insert().values({CLIENT_SEARCH_TABLE: 'rebuild'}))
+    db.session.commit()
+    return dialect
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_clients(query, term):
+    """
+    Добавление условия поиска клиентов к запросу
+
+    Аргументы:
+        query: Запрос SQLAlchemy, выбирающий из таблицы clients
+        term (str): Строка поиска (подстрока наименования или идентификатора)
+
+    Возвращает:
+        tuple: (query, order_by)
+            query: Запрос с условием поиска
+            order_by (tuple): Сортировка по релевантности для применения после подсчета записей
+    """
+    term = term.strip()
+    pattern = _escape_like(term)
+    dialect = db.engine.dialect.name
+
+    # Точное совпадение идентификатора, затем префиксы идентификатора и наименования
+    exact_rank = case(
+        (Client.client_identifier == term, 0),
+        (Client.client_identifier.ilike(f'{pattern}%', escape='\\'), 1),
+        (Client.name.ilike(f'{pattern}%', escape='\\'), 2),
+        else_=3
+    )
+
+    if dialect == 'sqlite' and len(term) >= MIN_INDEXED_LENGTH:
+        phrase = '"' + term.replace('"', '""') + '"'
+        matches = select(
+            _fts.c.rowid.label('client_id'),
+            _fts.c.rank.label('rank')
+        ).where(_fts.c[CLIENT_SEARCH_TABLE].op('MATCH')(phrase)).subquery()
+        query = query.join(matches, matches.c.client_id == Client.id)
+        return query, (exact_rank, matches.c.rank, Client.id)
+
+    query = query.filter(or_(
+        Client.name.ilike(f'%{pattern}%', escape='\\'),
+        Client.client_identifier.ilike(f'%{pattern}%', escape='\\')
+    ))
+    if dialect == 'postgresql':
+        return query, (exact_rank, func.similarity(Client.name, term).desc(), Client.id)
+    return query, (exact_rank, Client.id)
@@ -0,0 +1,199 @@
+import json
+import time
+from operator import attrgetter
+
+from flask import current_app, jsonify
+
+from metrics import request_metrics
+from models import BlockReason, Client, PaymentBlock
+from schemas import ClientBlockHistorySchema, ClientSchema, ClientStatusSchema, PaymentBlockSchema
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него используется стандартный json
+    orjson = None
+
+# Быстрая сериализация ответов без marshmallow. Результат побайтно совпадает с
+# jsonify(schema.dump(...)) в компактном режиме: ключи отсортированы, не-ASCII символы
+# экранированы, ответ завершается переводом строки. При FAST_SERIALIZER = False и при
+# нестандартных настройках JSON-провайдера Flask используется прежний путь через marshmallow.
+
+# Поля PaymentBlockSchema в порядке сортировки ключей jsonify
+PAYMENT_BLOCK_FIELDS = (
+    'blocked_at', 'blocked_by', 'client_id', 'details', 'expires_at', 'id',
+    'is_active', 'reason', 'unblock_reason', 'unblocked_at', 'unblocked_by'
+)
+
+# Столбцы для запросов, возвращающих кортежи вместо объектов ORM
+PAYMENT_BLOCK_COLUMNS = tuple(getattr(PaymentBlock, name) for name in PAYMENT_BLOCK_FIELDS)
+
+_payment_block_values = attrgetter(*PAYMENT_BLOCK_FIELDS)
+
+# Поля ClientSchema в порядке сортировки ключей и столбцы запроса списка клиентов
+CLIENT_FIELDS = ('client_identifier', 'created_at', 'id', 'is_blocked', 'name', 'updated_at')
+CLIENT_COLUMNS = (
+    Client.client_identifier, Client.created_at, Client.id,
+    Client.is_blocked.label('is_blocked'), Client.name, Client.updated_at
+)
+
+# Значения перечисления вычисляются один раз
+_REASON_VALUES = {reason: reason.value for reason in BlockReason}
+
+_payment_block_schema = PaymentBlockSchema()
+_client_schema = ClientSchema()
+_client_status_schema = ClientStatusSchema()
+_client_block_history_schema = ClientBlockHistorySchema()
+
+
+def enabled():
+    """Проверка, что быстрый путь включен и даст тот же результат, что и jsonify"""
+    app = current_app
+    provider = app.json
+    compact = getattr(provider, 'compact', None)
+    return (
+        app.config.get('FAST_SERIALIZER', True)
+        and getattr(provider, 'sort_keys', False)
+        and getattr(provider, 'ensure_ascii', False)
+        and compact is not False
+        and not (compact is None and app.debug)
+    )
+
+
+def _isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+def _payment_block_from_values(values):
+    (blocked_at, blocked_by, client_id, details, expires_at, block_id,
+     is_active, reason, unblock_reason, unblocked_at, unblocked_by) = values
+    return {
+        'blocked_at': _isoformat(blocked_at),
+        'blocked_by': blocked_by,
+        'client_id': client_id,
+        'details': details,
+        'expires_at': _isoformat(expires_at),
+        'id': block_id,
+        'is_active': is_active,
+        'reason': _REASON_VALUES.get(reason),
+        'unblock_reason': unblock_reason,
+        'unblocked_at': _isoformat(unblocked_at),
+        'unblocked_by': unblocked_by,
+    }
+
+
+def dump_payment_block(block):
+    """
+    Сериализация блокировки
+
+    Аргументы:
+        block: Объект PaymentBlock или строка запроса по PAYMENT_BLOCK_COLUMNS
+
+    Возвращает:
+        dict: То же, что PaymentBlockSchema().dump(block)
+    """
+    if not enabled():
+        return _payment_block_schema.dump(block)
+    if isinstance(block, PaymentBlock):
+        return _payment_block_from_values(_payment_block_values(block))
+    return _payment_block_from_values(block)
+
+
+def dump_payment_blocks(blocks):
+    """Сериализация списка блокировок (объектов PaymentBlock или строк по PAYMENT_BLOCK_COLUMNS)"""
+    if not enabled():
+        return _payment_block_schema.dump(blocks, many=True)
+    return [
+        _payment_block_from_values(_payment_block_values(block) if isinstance(block, PaymentBlock) else block)
+        for block in blocks
+    ]
+
+
+def dump_clients(rows):
+    """Сериализация списка клиентов из строк запроса по CLIENT_COLUMNS (то же, что ClientSchema)"""
+    if not enabled():
+        return _client_schema.dump(rows, many=True)
+    return [
+        {
+            'client_identifier': client_identifier,
+            'created_at': _isoformat(created_at),
+            'id': client_id,
+            'is_blocked': bool(is_blocked),
+            'name': name,
+            'updated_at': _isoformat(updated_at),
+        }
+        for client_identifier, created_at, client_id, is_blocked, name, updated_at in rows
+    ]
+
+
+def dump_client_status(client_identifier, active_block):
+    """Сериализация статуса блокировки клиента (то же, что ClientStatusSchema)"""
+    if not enabled():
+        return _client_status_schema.dump({
+            "client_identifier": client_identifier,
+            "is_blocked": active_block is not None,
+            "block_details": active_block
+        })
+    return {
+        'block_details': None if active_block is None else _payment_block_from_values(_payment_block_values(active_block)),
+        'client_identifier': client_identifier,
+        'is_blocked': active_block is not None,
+    }
+
+
+def dump_client_block_history(client_identifier, client_name, blocks):
+    """Сериализация истории блокировок клиента (то же, что ClientBlockHistorySchema)"""
+    if not enabled():
+        return _client_block_history_schema.dump({
+            "client_identifier": client_identifier,
+            "client_name": client_name,
+            "block_history": blocks
+        })
+    return {
+        'block_history': dump_payment_blocks(blocks),
+        'client_identifier': client_identifier,
+        'client_name': client_name,
+    }
+
+
+def dumps(obj):
+    """
+    Кодирование в JSON с завершающим переводом строки, как в ответе jsonify
+
+    orjson используется, если он установлен и результат состоит только из печатных
+    ASCII-символов (orjson не экранирует не-ASCII символы и DEL); иначе — стандартный json.
+    Документы не должны содержать чисел с плавающей точкой: их экспоненциальная запись
+    в orjson отличается от json.
+
+    Возвращает:
+        bytes: Закодированный документ
+    """
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            data = None
+        if data is not None and data.isascii() and b'\x7f' not in data:
+            return data
+    return (json.dumps(obj, sort_keys=True, separators=(',', ':')) + '\n').encode('ascii')
+
+
+def json_line(obj):
+    """Строка NDJSON: документ в компактной записи и перевод строки"""
+    started = time.perf_counter()
+    if not enabled():
+        line = current_app.json.dumps(obj, separators=(',', ':')) + '\n'
+    else:
+        line = dumps(obj)
+    request_metrics.observe_serialization(time.perf_counter() - started)
+    return line
+
+
+def json_response(obj):
+    """Ответ application/json, побайтно совпадающий с jsonify(obj)"""
+    started = time.perf_counter()
+    if not enabled():
+        response = jsonify(obj)
+    else:
+        response = current_app.response_class(dumps(obj), mimetype=current_app.json.mimetype)
+    request_metrics.observe_serialization(time.perf_counter() - started)
+    return response
@@ -0,0 +1,173 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+# Файл снимка: заголовок, таблица причин блокировки и отсортированный массив записей
+# фиксированной ширины. Модуль использует только стандартную библиотеку, чтобы его
+# можно было подключать в процессах платежного шлюза без Flask и SQLAlchemy.
+MAGIC = b'PBSNAP01'
+
+# Заголовок: сигнатура, число записей, ширина ключа, длина таблицы причин, время формирования
+HEADER = struct.Struct('<8sQHHQ')
+
+
+def record_struct(key_width):
+    """Формат записи: ключ фиксированной ширины, код причины, id блокировки"""
+    return struct.Struct(f'<{key_width}sBQ')
+
+
+def encode_key(client_identifier):
+    """Ключ записи — идентификатор клиента в UTF-8 (порядок сортировки — побайтовый)"""
+    return client_identifier.encode('utf-8')
+
+
+def write_snapshot(path, entries, generated_at=None):
+    """
+    Атомарная запись снимка: данные пишутся во временный файл, который затем
+    переименовывается поверх прежнего, поэтому читатели видят либо старую,
+    либо новую версию целиком.
+
+    Аргументы:
+        path (str): Путь к файлу снимка
+        entries (iterable): Тройки (client_identifier, reason, block_id); reason — строка
+        generated_at (int, optional): Время формирования (Unix time), по умолчанию текущее
+
+    Возвращает:
+        int: Число записей в снимке
+    """
+    records = sorted((encode_key(identifier), reason, block_id) for identifier, reason, block_id in entries)
+    reasons = sorted({reason for _, reason, _ in records})
+    reason_codes = {reason: code for code, reason in enumerate(reasons)}
+    reason_table = '\0'.join(reasons).encode('utf-8')
+    key_width = max((len(key) for key, _, _ in records), default=1)
+    record = record_struct(key_width)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as output:
+            output.write(HEADER.pack(
+                MAGIC, len(records), key_width, len(reason_table),
+                int(generated_at if generated_at is not None else time.time())
+            ))
+            output.write(reason_table)
+            for key, reason, block_id in records:
+                output.write(record.pack(key, reason_codes[reason], block_id))
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Фиксация переименования в каталоге
+    if hasattr(os, 'O_DIRECTORY'):
+        directory_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+    return len(records)
+
+
+class _Snapshot:
+    """Одна отображенная в память версия файла снимка"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            stat = os.fstat(source.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.buffer = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, self.key_width, reasons_length, self.generated_at = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a payment block snapshot")
+
+        reasons_offset = HEADER.size
+        reason_table = self.buffer[reasons_offset:reasons_offset + reasons_length].decode('utf-8')
+        self.reasons = reason_table.split('\0') if reason_table else []
+        self.offset = reasons_offset + reasons_length
+        self.record = record_struct(self.key_width)
+
+    def lookup(self, key):
+        if len(key) > self.key_width:
+            return None
+        key = key.ljust(self.key_width, b'\0')
+
+        buffer, width, size, offset = self.buffer, self.key_width, self.record.size, self.offset
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * size
+            current = buffer[start:start + width]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                _, reason_code, block_id = self.record.unpack_from(buffer, start)
+                return self.reasons[reason_code], block_id
+        return None
+
+
+class SnapshotReader:
+    """
+    Читатель снимка активных блокировок.
+
+    Не чаще чем раз в check_interval секунд проверяет, не заменен ли файл, и при
+    необходимости отображает новую версию; перезапуск процесса не требуется.
+    Прежняя версия освобождается, когда на нее не остается ссылок.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(path)
+        self._checked_at = time.monotonic()
+
+    def lookup(self, client_identifier):
+        """
+        Поиск активной блокировки клиента
+
+        Возвращает:
+            tuple: (reason, block_id) или None, если активной блокировки нет
+        """
+        self._maybe_reload()
+        return self._snapshot.lookup(encode_key(client_identifier))
+
+    def is_blocked(self, client_identifier):
+        """Проверка наличия активной блокировки у клиента"""
+        return self.lookup(client_identifier) is not None
+
+    def __contains__(self, client_identifier):
+        return self.is_blocked(client_identifier)
+
+    def __len__(self):
+        return self._snapshot.count
+
+    @property
+    def generated_at(self):
+        """Время формирования текущей версии снимка (Unix time)"""
+        return self._snapshot.generated_at
+
+    def reload(self):
+        """Принудительная проверка и загрузка новой версии файла"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            stat = os.stat(self.path)
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._snapshot.identity:
+                self._snapshot = _Snapshot(self.path)
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        try:
+            self.reload()
+        except (OSError, ValueError):
+            # Файл временно недоступен: продолжаем работать с текущей версией
+            pass
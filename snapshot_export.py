@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+
+from app import db
+from models import Client, PaymentBlock
+from snapshot import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotExporter:
+    """
+    Формирование снимка активных блокировок (см. snapshot.py) после изменений и по расписанию.
+
+    Запросы на пересборку после блокировки и разблокировки объединяются: фоновый поток
+    ждет SNAPSHOT_DEBOUNCE секунд и собирает снимок один раз для всех накопившихся
+    изменений. Если задан SNAPSHOT_INTERVAL, снимок дополнительно пересобирается
+    периодически, что учитывает изменения, сделанные другими процессами.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.path = None
+        self.interval = None
+        self.debounce = 1.0
+        self._pending = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Чтение настроек SNAPSHOT_PATH, SNAPSHOT_INTERVAL и SNAPSHOT_DEBOUNCE"""
+        self.app = app
+        self.path = app.config.get("SNAPSHOT_PATH")
+        self.interval = app.config.get("SNAPSHOT_INTERVAL")
+        self.debounce = app.config.get("SNAPSHOT_DEBOUNCE", self.debounce)
+        if self.path and self.interval:
+            self._ensure_thread()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def request_rebuild(self):
+        """Запрос пересборки снимка после фиксации изменения блокировок"""
+        if not self.enabled:
+            return
+        self._pending.set()
+        self._ensure_thread()
+
+    def export(self, path=None):
+        """
+        Немедленное формирование снимка в текущем контексте приложения
+
+        Аргументы:
+            path (str, optional): Путь к файлу снимка вместо SNAPSHOT_PATH
+
+        Возвращает:
+            int: Число активных блокировок в снимке
+        """
+        rows = db.session.query(Client.client_identifier, PaymentBlock.reason, PaymentBlock.id).join(
+            PaymentBlock, PaymentBlock.client_id == Client.id
+        ).filter(PaymentBlock.is_active.is_(True)).yield_per(10000)
+
+        count = write_snapshot(
+            path or self.path,
+            ((identifier, reason.value, block_id) for identifier, reason, block_id in rows)
+        )
+        db.session.remove()
+        return count
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="snapshot-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            triggered = self._pending.wait(timeout=self.interval)
+            if triggered:
+                # Объединение серии изменений в одну пересборку
+                time.sleep(self.debounce)
+            self._pending.clear()
+
+            try:
+                with self.app.app_context():
+                    count = self.export()
+                logger.debug(f"Snapshot of {count} active blocks written to {self.path}")
+            except Exception as err:
+                logger.error(f"Failed to write active block snapshot: {str(err)}")
+
+
+snapshot_exporter = SnapshotExporter()
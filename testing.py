@@ -0,0 +1,65 @@
+"""
+Вспомогательные функции для проверки приложения
+
+assert_constant_queries проверяет, что число SQL-запросов эндпоинта не растет
+вместе с объемом данных (признак N+1 запросов).
+"""
+from app import db
+from metrics import QueryCounter
+
+# Объемы данных, при которых сравнивается число запросов
+DEFAULT_SIZES = (1, 10, 50)
+
+
+def query_counts(app, seed, send, sizes=DEFAULT_SIZES):
+    """
+    Число SQL-запросов одного HTTP-запроса при разных объемах данных
+
+    Аргументы:
+        app: Приложение Flask
+        seed (callable): seed(size) доводит данные до объема size; вызывается
+                         в контексте приложения, транзакция фиксируется после вызова
+        send (callable): send(client) выполняет проверяемый запрос тестовым клиентом
+                         и возвращает ответ
+        sizes (tuple): Возрастающие объемы данных
+
+    Возвращает:
+        list: Пары (объем, число SQL-запросов)
+    """
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+
+    counts = []
+    for size in sizes:
+        with app.app_context():
+            seed(size)
+            db.session.commit()
+
+        # Первый запрос прогревает кэши приложения и SQLAlchemy
+        send(client)
+        with QueryCounter(engine) as counter:
+            response = send(client)
+        if response.status_code >= 400:
+            raise AssertionError(f"Request failed with status {response.status_code} at size {size}")
+        counts.append((size, counter.count))
+    return counts
+
+
+def assert_constant_queries(app, seed, send, sizes=DEFAULT_SIZES):
+    """
+    Проверяет, что число SQL-запросов не зависит от объема данных
+
+    Аргументы те же, что у query_counts.
+
+    Возвращает:
+        int: Число SQL-запросов
+
+    Исключения:
+        AssertionError: Число запросов меняется с объемом данных
+    """
+    counts = query_counts(app, seed, send, sizes)
+    if len({count for _, count in counts}) > 1:
+        details = ", ".join(f"{size}: {count}" for size, count in counts)
+        raise AssertionError(f"SQL query count grows with the data (size: queries): {details}")
+    return counts[0][1]
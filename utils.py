@@ -1,10 +1,28 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
 from app import db
-from models import Client
+from models import Client, PaymentBlock, BlockEvent, BlockReason, ChangeSequence, StatCounter
+
+# Диалекты, поддерживающие INSERT ... ON CONFLICT DO NOTHING RETURNING
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
 
 def get_or_create_client(client_identifier, name=None):
     """
     Получение существующего клиента или создание нового, если он не существует
     
+    Клиент создается одним запросом INSERT ... ON CONFLICT (client_identifier) DO NOTHING
+    RETURNING, поэтому одновременное создание одного и того же клиента несколькими
+    запросами не приводит к нарушению уникальности. Для диалектов без ON CONFLICT
+    вставка выполняется в точке сохранения с повторным чтением при конфликте.
+    
     Аргументы:
         client_identifier (str): Уникальный идентификатор клиента (ИНН, ОГРН и т.д.)
         name (str, optional): Наименование клиента. Если не указано, для новых клиентов
@@ -12,16 +30,279 @@ def get_or_create_client(client_identifier, name=None):
                              
     Возвращает:
         tuple: (client, created)
-            client (Client): Полученный или созданный клиент
+            client (Client): Полученный или созданный клиент (уже сохранен в БД, id заполнен)
             created (bool): True, если был создан новый клиент, False в противном случае
     """
-    client = Client.query.filter_by(client_identifier=client_identifier).first()
+    values = {
+        'client_identifier': client_identifier,
+        'name': name or client_identifier,
+    }
+    
+    dialect_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(Client).values(**values).on_conflict_do_nothing(
+            index_elements=[Client.client_identifier]
+        ).returning(Client)
+        client = db.session.scalars(stmt).first()
+    else:
+        try:
+            with db.session.begin_nested():
+                client = db.session.scalars(insert(Client).values(**values).returning(Client)).first()
+        except IntegrityError:
+            client = None
     
     if client:
-        return client, False
+        StatCounter.add({StatCounter.CLIENTS: 1})
+        return client, True
+    
+    # Клиент уже существует (в том числе создан параллельным запросом)
+    client = Client.query.filter_by(client_identifier=client_identifier).first()
+    
+    return client, False
+
+def create_active_block(client_id, reason, blocked_by, details=None, expires_at=None):
+    """
+    Создание активной блокировки одним SQL-запросом
+    
+    Вставка выполняется как INSERT ... ON CONFLICT DO NOTHING RETURNING по частичному
+    уникальному индексу uq_payment_blocks_active_client, поэтому проверка наличия
+    активной блокировки и вставка происходят атомарно на стороне БД.
+    
+    Аргументы:
+        client_id (int): Идентификатор клиента в таблице clients
+        reason (BlockReason): Причина блокировки
+        blocked_by (str): Сотрудник, создающий блокировку
+        details (str, optional): Дополнительные сведения о блокировке
+        expires_at (datetime, optional): Срок действия блокировки (UTC)
+        
+    Возвращает:
+        PaymentBlock: Созданная блокировка или None, если у клиента уже есть активная блокировка
+    """
+    values = {
+        'client_id': client_id,
+        'reason': reason,
+        'details': details,
+        'blocked_by': blocked_by,
+        'expires_at': expires_at,
+        'change_seq': ChangeSequence.allocate()[0],
+    }
+    
+    dialect_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(PaymentBlock).values(**values).on_conflict_do_nothing(
+            index_elements=[PaymentBlock.client_id],
+            index_where=PaymentBlock.is_active
+        ).returning(PaymentBlock)
+        block = db.session.scalars(stmt).first()
+    else:
+        # Переносимый вариант: конфликт определяется по нарушению уникального индекса
+        try:
+            with db.session.begin_nested():
+                block = db.session.scalars(insert(PaymentBlock).values(**values).returning(PaymentBlock)).first()
+        except IntegrityError:
+            block = None
+    
+    if block is not None:
+        StatCounter.record_created([(reason, True, block.blocked_at)])
+    return block
+
+def get_or_create_clients(client_identifiers, names=None):
+    """
+    Пакетное получение или создание клиентов
+    
+    Существующие клиенты читаются одним запросом с IN, недостающие создаются одной
+    пакетной вставкой INSERT ... ON CONFLICT DO NOTHING с последующим чтением их id.
+    
+    Аргументы:
+        client_identifiers (iterable): Идентификаторы клиентов (ИНН, ОГРН и т.д.)
+        names (dict, optional): Наименования новых клиентов по идентификатору; если
+                                наименование не указано, используется идентификатор
+        
+    Возвращает:
+        dict: Соответствие идентификатора клиента его id в таблице clients
+    """
+    identifiers = list(dict.fromkeys(client_identifiers))
+    if not identifiers:
+        return {}
+    
+    client_ids = dict(
+        db.session.query(Client.client_identifier, Client.id)
+        .filter(Client.client_identifier.in_(identifiers))
+        .all()
+    )
+    missing = [identifier for identifier in identifiers if identifier not in client_ids]
+    if not missing:
+        return client_ids
+    
+    dialect_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    names = names or {}
+    if dialect_insert is None:
+        for identifier in missing:
+            client, _ = get_or_create_client(identifier, names.get(identifier))
+            client_ids[identifier] = client.id
+        return client_ids
+    
+    # RETURNING отдает только вставленные строки; клиенты, созданные параллельно, дочитываются
+    created = dict(db.session.execute(
+        dialect_insert(Client).on_conflict_do_nothing(
+            index_elements=[Client.client_identifier]
+        ).returning(Client.client_identifier, Client.id),
+        [{'client_identifier': identifier, 'name': names.get(identifier) or identifier} for identifier in missing]
+    ).all())
+    StatCounter.add({StatCounter.CLIENTS: len(created)})
+    client_ids.update(created)
+    
+    concurrent = [identifier for identifier in missing if identifier not in created]
+    if concurrent:
+        client_ids.update(
+            db.session.query(Client.client_identifier, Client.id)
+            .filter(Client.client_identifier.in_(concurrent))
+            .all()
+        )
+    
+    return client_ids
+
+def create_active_blocks(rows):
+    """
+    Пакетное создание активных блокировок
+    
+    Все строки вставляются одним пакетным запросом INSERT ... ON CONFLICT DO NOTHING
+    RETURNING по частичному уникальному индексу uq_payment_blocks_active_client.
+    
+    Аргументы:
+        rows (list): Словари с ключами client_id, reason, blocked_by, details и expires_at;
+                     client_id в пределах пакета не должны повторяться
+        
+    Возвращает:
+        dict: Соответствие client_id созданной блокировке PaymentBlock; клиенты,
+              у которых уже была активная блокировка, в результат не попадают
+    """
+    if not rows:
+        return {}
+    
+    dialect_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if dialect_insert is None:
+        blocks = (create_active_block(**row) for row in rows)
+        return {block.client_id: block for block in blocks if block is not None}
+    
+    # Номера строк, не вставленных из-за конфликта, остаются пропусками в ленте изменений
+    rows = [dict(row, change_seq=seq) for row, seq in zip(rows, ChangeSequence.allocate(len(rows)))]
+    stmt = dialect_insert(PaymentBlock).on_conflict_do_nothing(
+        index_elements=[PaymentBlock.client_id],
+        index_where=PaymentBlock.is_active
+    ).returning(PaymentBlock)
+    
+    blocks = {block.client_id: block for block in db.session.scalars(stmt, rows)}
+    StatCounter.record_created((block.reason, True, block.blocked_at) for block in blocks.values())
+    return blocks
+
+def touch_clients(client_ids):
+    """
+    Увеличение версии клиентов после изменения их блокировок
+    
+    Версия и updated_at клиента используются для формирования ETag ответов о статусе,
+    истории и списке блокировок. Вызывается в той же транзакции, что и изменение.
+    
+    Аргументы:
+        client_ids (iterable): Идентификаторы клиентов в таблице clients
+    """
+    client_ids = set(client_ids)
+    if not client_ids:
+        return
+    
+    db.session.execute(
+        update(Client)
+        .where(Client.id.in_(client_ids))
+        .values(version=Client.version + 1, updated_at=datetime.utcnow()),
+        execution_options={"synchronize_session": False}
+    )
+
+def record_block_events(event_type, blocks):
+    """
+    Запись событий изменения блокировок в журнал block_events
+    
+    Вызывается в той же транзакции, что и изменение, поэтому событие становится
+    видимым подписчикам только вместе с зафиксированным изменением.
+    
+    Аргументы:
+        event_type (str): BlockEvent.BLOCK_CREATED или BlockEvent.BLOCK_REMOVED
+        blocks (iterable): Пары (client_identifier, block), где block — результат
+                           PaymentBlockSchema.dump
+    """
+    rows = [
+        {
+            'event_type': event_type,
+            'block_id': block['id'],
+            'client_identifier': client_identifier,
+            'payload': json.dumps(block, separators=(',', ':'), sort_keys=True),
+        }
+        for client_identifier, block in blocks
+    ]
+    if rows:
+        db.session.execute(insert(BlockEvent), rows)
+
+def block_stats(now=None):
+    """
+    Статистика блокировок для панели мониторинга
+    
+    При включенной настройке STAT_COUNTERS все значения читаются из таблицы stat_counters
+    (по две строки на причину и по строке на день), иначе считаются одним запросом
+    с группировкой по причине. Число последних блокировок в режиме счетчиков складывается
+    из дневных строк за календарные дни UTC (текущий и шесть предыдущих), в агрегирующем
+    режиме считается за скользящие 7 суток.
+    
+    Аргументы:
+        now (datetime, optional): Текущее время (UTC)
+        
+    Возвращает:
+        dict: total_clients, total_blocks, active_blocks, blocks_by_type,
+              blocks_by_reason, recent_blocks, source и timestamp
+    """
+    now = now or datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    by_reason = {reason: {'total': 0, 'active': 0} for reason in BlockReason}
     
-    # Создание нового клиента
-    client_name = name or client_identifier
-    client = Client(client_identifier=client_identifier, name=client_name)
+    if StatCounter.enabled():
+        source = 'counters'
+        day_keys = [StatCounter.day_key(day) for day in StatCounter.recent_days(now)]
+        counters = dict(db.session.query(StatCounter.name, StatCounter.value).filter(
+            StatCounter.name.in_(StatCounter.names() + day_keys)
+        ))
+        for reason, counts in by_reason.items():
+            counts['total'] = counters.get(StatCounter.blocks_key(reason), 0)
+            counts['active'] = counters.get(StatCounter.active_key(reason), 0)
+        total_clients = counters.get(StatCounter.CLIENTS, 0)
+        recent_blocks = sum(counters.get(key, 0) for key in day_keys)
+    else:
+        source = 'aggregate'
+        rows = db.session.query(
+            PaymentBlock.reason,
+            func.count(PaymentBlock.id),
+            func.sum(case((PaymentBlock.is_active, 1), else_=0)),
+            func.sum(case((PaymentBlock.blocked_at >= week_ago, 1), else_=0)),
+            select(func.count(Client.id)).scalar_subquery(),
+        ).group_by(PaymentBlock.reason).all()
+        recent_blocks = 0
+        total_clients = rows[0][4] if rows else db.session.query(func.count(Client.id)).scalar()
+        for reason, total, active, recent, _ in rows:
+            by_reason[reason] = {'total': total, 'active': active or 0}
+            recent_blocks += recent or 0
     
-    return client, True
+    fraud = by_reason[BlockReason.FRAUD_SUSPICION]['active']
+    active_blocks = sum(counts['active'] for counts in by_reason.values())
+    return {
+        'total_clients': total_clients,
+        'total_blocks': sum(counts['total'] for counts in by_reason.values()),
+        'active_blocks': active_blocks,
+        'blocks_by_type': {
+            'fraud': fraud,
+            'non_fraud': active_blocks - fraud,
+        },
+        'blocks_by_reason': [
+            {'reason': reason.value, 'active_count': counts['active'], 'total_count': counts['total']}
+            for reason, counts in by_reason.items()
+        ],
+        'recent_blocks': recent_blocks,
+        'source': source,
+        'timestamp': now.isoformat(),
+    }